@@ -1,6 +1,6 @@
 from pathlib import Path
 import dj_database_url
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -13,7 +13,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = config('DEBUG', default=True, cast=bool)
 
 ALLOWED_HOSTS = ['*']
 CSRF_TRUSTED_ORIGINS = ['https://*.onrender.com', 'http://127.0.0.1:8000']
@@ -31,14 +31,15 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'events',
-    'debug_toolbar',
     "django.contrib.sites"
 ]
 SITE_ID = 1
 
 MIDDLEWARE = [
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    'events.middleware.RequestProfilingMiddleware',
+    'events.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'events.middleware.TimezoneMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -47,6 +48,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE.insert(1, "debug_toolbar.middleware.DebugToolbarMiddleware")
+    INTERNAL_IPS = ['127.0.0.1']
+
 ROOT_URLCONF = 'event_management_system.urls'
 
 TEMPLATES = [
@@ -85,6 +91,22 @@ DATABASES = {
         conn_max_age=600
     )
 }
+
+# Read replicas, comma separated URLs. The events app's reads in GET requests go to
+# them, see events/routers.py. To try it locally with SQLite standing in for both:
+#   DATABASE_URL=sqlite:///db.sqlite3 REPLICA_DATABASE_URLS=sqlite:///replica.sqlite3
+# (copy db.sqlite3 to replica.sqlite3 to "replicate"). In tests every replica is a
+# mirror of the test database.
+DATABASE_REPLICAS = []
+for i, url in enumerate(config('REPLICA_DATABASE_URLS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{i}'] = dj_database_url.parse(url, conn_max_age=600)
+    DATABASES[f'replica{i}']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(f'replica{i}')
+DATABASE_ROUTERS = ['events.routers.PrimaryReplicaRouter']
+# Requests from a browser that wrote something read from the primary for this long
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+REPLICA_PIN_COOKIE = 'primary_pin'
+
 # PostgresSql DB 
 # DATABASES = {
 #     'default': {
@@ -127,6 +149,11 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Organizers enter event dates and times on their own clock, and pages show
+# them in the viewer's: both use the browser's zone, sent in this cookie
+# (events/middleware.py). TIME_ZONE without it, and for imports.
+TIME_ZONE_COOKIE = 'tz'
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -135,6 +162,22 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS =[
     BASE_DIR / 'static' 
 ]
+# collectstatic writes hashed names plus .gz / .br variants here (events/storage.py)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'events.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Static files and media are served by events/files.py. Behind nginx set
+# SENDFILE_BACKEND=nginx and map SENDFILE_NGINX_PREFIX to the directories:
+#   location /internal/static/ { internal; alias /app/staticfiles/; }
+#   location /internal/media/  { internal; alias /app/media/; }
+# or SENDFILE_BACKEND=xsendfile for Apache's mod_xsendfile / lighttpd.
+SENDFILE_BACKEND = config('SENDFILE_BACKEND', default='')
+SENDFILE_NGINX_PREFIX = '/internal/'
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=7 * 24 * 60 * 60, cast=int)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -144,6 +187,31 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Seconds a user's group names are cached across requests (0 = only per request).
+# Use a shared cache backend before turning this on with several processes.
+ROLE_CACHE_TIMEOUT = config('ROLE_CACHE_TIMEOUT', default=0, cast=int)
+
+# Recurring events (events/occurrences.py): how many days ahead the occurrences
+# that aren't stored are listed
+RECURRENCE_HORIZON_DAYS = config('RECURRENCE_HORIZON_DAYS', default=365, cast=int)
+
+# Request profiling (events/middleware.py): share of requests that get a full
+# query/template breakdown (0.01 is plenty in production), and the duration above
+# which a request is always logged
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0, cast=float)
+PROFILING_SLOW_REQUEST_MS = config('PROFILING_SLOW_REQUEST_MS', default=1000, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'events.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Auth redirects
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'post_login_redirect' 
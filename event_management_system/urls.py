@@ -1,12 +1,22 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from events.files import serve_media, serve_static
+
+
+def _prefix(url):
+    return re.escape(url.lstrip('/'))
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('events.urls')),
+    re_path(rf'^{_prefix(settings.STATIC_URL)}(?P<path>.+)$', serve_static, name='static_file'),
+    re_path(rf'^{_prefix(settings.MEDIA_URL)}(?P<path>.+)$', serve_media, name='media_file'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += [path('__debug__/', include('debug_toolbar.urls'))]
@@ -1,6 +1,90 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Category, Event, RSVP
+from django.db import transaction
+from django.db.models import Q
+from django.template.response import TemplateResponse
+
+from .models import CustomUser, Category, Event, EventSeries, RSVP, OutboundEmail, ReminderLog
+from .pagination import EstimatedCountPaginator
+from .stats import forget_dashboard_stats
+
+# rows per transaction in the bulk actions, so "select all" on a big table
+# neither holds one huge transaction nor loads every object at once
+ACTION_CHUNK_SIZE = 500
+
+
+def _chunks(queryset, size=ACTION_CHUNK_SIZE):
+    chunk = []
+    for pk in queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=size):
+        chunk.append(pk)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Foreign key filter that doesn't list every related row in the sidebar: a
+    search box backed by the related model admin's search_fields, the same as
+    autocomplete_fields on the change form. Only the selected object is loaded.
+    Use with AutocompleteFilterMixin, which adds the select2 scripts.
+    """
+    template = 'admin/events/autocomplete_filter.html'
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def widget(self, admin_site):
+        return AutocompleteSelect(self.field, admin_site)
+
+    def choices(self, changelist):
+        form_field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(),
+            widget=self.widget(changelist.model_admin.admin_site),
+            required=False,
+        )
+        self.rendered_widget = form_field.widget.render(self.lookup_kwarg, self.lookup_val[-1] if self.lookup_val else None)
+        # the other filters, the search and the ordering survive picking a value
+        self.hidden_params = [
+            (name, value) for name, value in changelist.params.items()
+            if name not in (self.lookup_kwarg, self.lookup_kwarg_isnull)
+        ]
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'display': 'All',
+        }
+
+
+class AutocompleteFilterMixin:
+    @property
+    def media(self):
+        media = super().media
+        for item in self.list_filter:
+            if isinstance(item, tuple) and issubclass(item[1], AutocompleteFilter):
+                field = get_fields_from_path(self.model, item[0])[-1]
+                media += AutocompleteSelect(field, self.admin_site).media
+        return media
+
+
+class LargeTableAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    """
+    Changelists for tables too big to COUNT(*) on every page view: the page count
+    comes from the planner's estimate on PostgreSQL and the unfiltered total
+    ("x of y selected") isn't computed at all.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -11,19 +95,109 @@ class CustomUserAdmin(UserAdmin):
     add_fieldsets = UserAdmin.add_fieldsets + (
         (None, {'fields': ('profile_picture', 'phone_number')}),
     )
+    # Also what the user autocompletes search. Prefix search on the unique
+    # username uses its index (PostgreSQL adds a varchar_pattern_ops one),
+    # icontains over four columns would scan the table.
+    search_fields = ('username__startswith',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 # আগের register করা অংশ
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('id', 'name')
+    search_fields = ('name',)
+
+
+class MoveToCategoryForm(forms.Form):
+    category = forms.ModelChoiceField(queryset=Category.objects.order_by('name'))
+
 
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'category', 'date', 'time', 'location')
-    list_filter = ('category', 'date')
+class EventAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'category', 'organizer', 'date', 'time', 'location', 'participant_count')
+    list_select_related = ('category', 'organizer')
+    list_filter = ('category', ('organizer', AutocompleteFilter), 'starts_at')
+    autocomplete_fields = ('category', 'organizer')
+    # full-text search, see get_search_results
+    search_fields = ('name',)
+    actions = ('move_to_category',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        # the FTS index (search.py) instead of LIKE '%term%' over the table
+        return queryset.search(search_term, ranked=False), False
+
+    @admin.action(description="Move selected events to another category", permissions=['change'])
+    def move_to_category(self, request, queryset):
+        form = MoveToCategoryForm(request.POST if 'apply' in request.POST else None)
+        if not form.is_valid():
+            return TemplateResponse(request, 'admin/events/move_to_category.html', {
+                **self.admin_site.each_context(request),
+                'title': "Move events to another category",
+                'opts': self.opts,
+                'form': form,
+                'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+                'select_across': request.POST.get('select_across', '0'),
+                'count': queryset.count(),
+            })
+        category = form.cleaned_data['category']
+        moved = 0
+        for chunk in _chunks(queryset):
+            with transaction.atomic():
+                # touch() so the cached pages and cards pick up the new category
+                moved += Event.objects.filter(pk__in=chunk).touch(category=category)
+        forget_dashboard_stats()
+        self.message_user(request, f"Moved {moved} events to {category}.", messages.SUCCESS)
+
+
+@admin.register(EventSeries)
+class EventSeriesAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'category', 'organizer', 'rule', 'starts_on', 'ends_on', 'time')
+    list_select_related = ('category', 'organizer')
+    list_filter = ('category',)
+    autocomplete_fields = ('category', 'organizer')
+    search_fields = ('name',)
+
 
 @admin.register(RSVP)
-class RSVPAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'event', 'created_at')
-    list_filter = ('event', 'created_at')
-    search_fields = ('user__username', 'event__name')
+class RSVPAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'event', 'status', 'created_at', 'checked_in_at')
+    list_select_related = ('user', 'event')
+    list_filter = (('event', AutocompleteFilter), ('user', AutocompleteFilter), 'status', 'created_at')
+    autocomplete_fields = ('user', 'event')
+    search_fields = ('user__username__startswith',)
+    search_help_text = "Username prefix, or words from the event's name, location or description"
+    actions = ('cancel_rsvps',)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        # both subqueries are index lookups, then the RSVP foreign key indexes
+        users = CustomUser.objects.filter(username__startswith=term).values('pk')
+        events = Event.objects.search(term, ranked=False).values('pk')
+        return queryset.filter(Q(user__in=users) | Q(event__in=events)), False
+
+    @admin.action(description="Cancel selected RSVPs", permissions=['delete'])
+    def cancel_rsvps(self, request, queryset):
+        cancelled = 0
+        for chunk in _chunks(queryset):
+            with transaction.atomic():
+                # one by one through the delete signals: they free the seat and
+                # promote the waitlist
+                cancelled += RSVP.objects.filter(pk__in=chunk).delete()[1].get(RSVP._meta.label, 0)
+        self.message_user(request, f"Cancelled {cancelled} RSVPs.", messages.SUCCESS)
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+
+
+@admin.register(ReminderLog)
+class ReminderLogAdmin(LargeTableAdmin):
+    list_display = ('id', 'event', 'user', 'kind', 'sent_at')
+    list_select_related = ('event', 'user')
+    list_filter = (('event', AutocompleteFilter), 'kind', 'sent_at')
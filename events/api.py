@@ -0,0 +1,266 @@
+"""
+Read-only JSON API (v1) for the mobile app and partner widgets.
+
+Rows are read with .values() and written out as plain dicts; no model instances
+are built. `fields=` picks the columns that are SELECTed, lists use the same
+filters and keyset cursors as the HTML event list, and every response carries
+an ETag so polling clients mostly get 304s.
+"""
+import hashlib
+import json
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_safe
+
+from .caching import event_list_last_modified, event_list_tag
+from .forms import EventFilterForm
+from .models import Category, Event, RSVP
+from .pagination import keyset_paginate
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+# keyset cursor columns, always SELECTed
+CURSOR_FIELDS = ('date', 'id')
+
+
+class Field:
+    """An API field: the columns it needs and how to turn them into the JSON value."""
+    def __init__(self, *columns, compute=None):
+        self.columns = columns
+        self.compute = compute or (lambda row: row[columns[0]])
+
+
+def _seats_left(row):
+    if row['capacity'] is None:
+        return None
+    return max(row['capacity'] - row['participant_count'], 0)
+
+
+EVENT_FIELDS = {
+    'id': Field('id'),
+    'name': Field('name'),
+    'description': Field('description'),
+    'date': Field('date'),
+    'time': Field('time'),
+    # the zone date and time are in; starts_at is the same moment in UTC
+    'time_zone': Field('time_zone'),
+    'starts_at': Field('starts_at'),
+    'location': Field('location'),
+    'category': Field('category_id'),
+    'category_name': Field('category__name'),
+    'organizer': Field('organizer_id'),
+    'capacity': Field('capacity'),
+    'participant_count': Field('participant_count'),
+    'seats_left': Field('capacity', 'participant_count', compute=_seats_left),
+    'image': Field('image', compute=lambda row: default_storage.url(row['image']) if row['image'] else None),
+    'updated_at': Field('updated_at'),
+}
+EVENT_DEFAULT_FIELDS = (
+    'id', 'name', 'date', 'time', 'location', 'category', 'category_name', 'capacity', 'seats_left', 'image',
+)
+
+RSVP_FIELDS = {
+    'event': Field('event_id'),
+    'event_name': Field('event__name'),
+    'date': Field('event__date'),
+    'time': Field('event__time'),
+    'time_zone': Field('event__time_zone'),
+    'location': Field('event__location'),
+    'status': Field('status'),
+    'created_at': Field('created_at'),
+}
+
+CATEGORY_FIELDS = {
+    'id': Field('id'),
+    'name': Field('name'),
+    'description': Field('description'),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _requested_fields(request, spec, default=None):
+    raw = request.GET.get('fields', '')
+    names = [name.strip() for name in raw.split(',') if name.strip()] or list(default or spec)
+    unknown = [name for name in names if name not in spec]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(spec)}")
+    return names
+
+
+def _columns(spec, names, extra=()):
+    columns = list(extra)
+    for name in names:
+        columns += [c for c in spec[name].columns if c not in columns]
+    return columns
+
+
+def _serializer(spec, names):
+    fields = [(name, spec[name].compute) for name in names]
+    return lambda row: {name: compute(row) for name, compute in fields}
+
+
+def _limit(request):
+    try:
+        return min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        raise BadRequest("limit must be a number")
+
+
+def _page_url(request, **cursor):
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params.update(cursor)
+    return f'{request.path}?{params.urlencode()}'
+
+
+def _stream(rows, serialize, **extra):
+    # one row at a time, so a big page is never held as one JSON string
+    yield '{"results": ['
+    for i, row in enumerate(rows):
+        yield (',' if i else '') + json.dumps(serialize(row), cls=DjangoJSONEncoder)
+    # the remaining keys, e.g. "next": ..., "previous": ...
+    yield ']' + (', ' + json.dumps(extra)[1:] if extra else '}')
+
+
+def _json_api(view):
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return _error(str(e))
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return wrapper
+
+
+# ------------------------ EVENTS ------------------------
+
+def _event_list_etag(request):
+    return f"api-events-{event_list_tag(request)}"
+
+
+@require_safe
+@condition(etag_func=_event_list_etag, last_modified_func=event_list_last_modified)
+@_json_api
+def event_list(request):
+    """GET /api/v1/events/?fields=&q=&category=&from=&to=&after=&before=&limit="""
+    names = _requested_fields(request, EVENT_FIELDS, EVENT_DEFAULT_FIELDS)
+    queryset = EventFilterForm(request.GET).filter(Event.objects.all())
+    queryset = queryset.values(*_columns(EVENT_FIELDS, names, CURSOR_FIELDS))
+    page = keyset_paginate(
+        queryset, _limit(request), fields=CURSOR_FIELDS,
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+    return StreamingHttpResponse(
+        _stream(
+            page.object_list, _serializer(EVENT_FIELDS, names),
+            next=_page_url(request, after=page.next_cursor) if page.has_next() else None,
+            previous=_page_url(request, before=page.prev_cursor) if page.has_previous() else None,
+        ),
+        content_type='application/json',
+    )
+
+
+def _event_row(request, pk):
+    # loaded once for the ETag and the response
+    if not hasattr(request, '_api_event'):
+        names = _requested_fields(request, EVENT_FIELDS)
+        columns = _columns(EVENT_FIELDS, names, ('version', 'updated_at'))
+        request._api_event = (names, Event.objects.filter(pk=pk).values(*columns).first())
+    return request._api_event
+
+
+def _event_etag(request, pk):
+    try:
+        names, row = _event_row(request, pk)
+    except BadRequest:
+        return None
+    return row and f"api-event-{pk}-v{row['version']}-{hashlib.md5(','.join(names).encode()).hexdigest()[:8]}"
+
+
+def _event_last_modified(request, pk):
+    try:
+        return (_event_row(request, pk)[1] or {}).get('updated_at')
+    except BadRequest:
+        return None
+
+
+@require_safe
+@condition(etag_func=_event_etag, last_modified_func=_event_last_modified)
+@_json_api
+def event_detail(request, pk):
+    """GET /api/v1/events/<pk>/?fields="""
+    names, row = _event_row(request, pk)
+    if row is None:
+        return _error("Event not found", status=404)
+    return JsonResponse(_serializer(EVENT_FIELDS, names)(row), encoder=DjangoJSONEncoder)
+
+
+# ------------------------ CATEGORIES ------------------------
+
+def _category_state(request):
+    if not hasattr(request, '_api_categories'):
+        request._api_categories = Category.objects.aggregate(n=Count('id'), last=Max('updated_at'))
+    return request._api_categories
+
+
+def _category_etag(request):
+    state = _category_state(request)
+    raw = f"{state['n']}:{state['last']}:{request.GET.urlencode()}"
+    return f"api-categories-{hashlib.md5(raw.encode()).hexdigest()[:16]}"
+
+
+@require_safe
+@condition(etag_func=_category_etag, last_modified_func=lambda request: _category_state(request)['last'])
+@_json_api
+def category_list(request):
+    """GET /api/v1/categories/?fields= (all of them, there are only a few)"""
+    names = _requested_fields(request, CATEGORY_FIELDS)
+    rows = Category.objects.order_by('name').values(*_columns(CATEGORY_FIELDS, names)).iterator()
+    return StreamingHttpResponse(_stream(rows, _serializer(CATEGORY_FIELDS, names)), content_type='application/json')
+
+
+# ------------------------ MY RSVPS ------------------------
+
+def _my_rsvps_state(request):
+    if not hasattr(request, '_api_rsvps'):
+        request._api_rsvps = RSVP.objects.filter(user_id=request.user.pk).aggregate(
+            n=Count('id'), last=Max('updated_at'), event_last=Max('event__updated_at'),
+        )
+    return request._api_rsvps
+
+
+def _my_rsvps_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    state = _my_rsvps_state(request)
+    raw = f"{request.user.pk}:{state['n']}:{state['last']}:{state['event_last']}:{request.GET.urlencode()}"
+    return f"api-rsvps-{hashlib.md5(raw.encode()).hexdigest()[:16]}"
+
+
+@require_safe
+@condition(etag_func=_my_rsvps_etag)
+@_json_api
+def my_rsvps(request):
+    """GET /api/v1/me/rsvps/?fields= (session login), soonest event first"""
+    if not request.user.is_authenticated:
+        return _error("Authentication required", status=401)
+    names = _requested_fields(request, RSVP_FIELDS)
+    rows = (
+        RSVP.objects.filter(user_id=request.user.pk)
+        .order_by('event__date', 'event__time', 'id')
+        .values(*_columns(RSVP_FIELDS, names))
+        .iterator()
+    )
+    return StreamingHttpResponse(_stream(rows, _serializer(RSVP_FIELDS, names)), content_type='application/json')
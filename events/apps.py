@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
@@ -6,3 +7,15 @@ class EventsConfig(AppConfig):
 
     def ready(self):
         from . import signals  # noqa
+        from .helpers import ensure_groups
+        post_migrate.connect(ensure_groups, sender=self)
+        post_migrate.connect(repair_search_triggers, sender=self)
+
+
+def repair_search_triggers(using, **kwargs):
+    from django.db import connections
+    from .search import install_sqlite_fts
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        install_sqlite_fts(connection, only_repair=True)
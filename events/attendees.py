@@ -0,0 +1,114 @@
+"""
+Attendee export and door check-in for an event's organizer.
+
+The export never builds model instances or holds the whole list: rows come from
+.values_list().iterator() and are written out as they arrive. Check-in marks any
+number of RSVPs with a single UPDATE.
+"""
+import csv
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.http import require_POST, require_safe
+
+from .helpers import has_role
+from .models import Event, RSVP
+
+EXPORT_COLUMNS = (
+    ('rsvp', 'id'),
+    ('username', 'user__username'),
+    ('first_name', 'user__first_name'),
+    ('last_name', 'user__last_name'),
+    ('email', 'user__email'),
+    ('status', 'status'),
+    ('rsvp_at', 'created_at'),
+    ('checked_in_at', 'checked_in_at'),
+)
+EXPORT_CHUNK_SIZE = 2000
+# ids per check-in request, keeps the IN (...) list under every backend's limit
+MAX_CHECK_IN = 1000
+
+
+def can_manage_attendees(user, event):
+    """The event's organizer, Admins and superusers."""
+    return user.is_superuser or event.organizer_id == user.pk or has_role(user, 'Admin')
+
+
+def _event_for_organizer(request, pk):
+    event = get_object_or_404(Event.objects.only('id', 'name', 'organizer_id'), pk=pk)
+    if not can_manage_attendees(request.user, event):
+        raise PermissionDenied
+    return event
+
+
+class _Echo:
+    # csv.writer wants a file, this one hands each line back instead of storing it
+    def write(self, value):
+        return value
+
+
+def _csv_rows(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _json_rows(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    yield '['
+    for i, row in enumerate(rows):
+        yield (',' if i else '') + json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder)
+    yield ']'
+
+
+@require_safe
+@login_required
+def export_attendees(request, pk):
+    """GET /event/<pk>/attendees/ (CSV, or ?format=json): everyone who RSVP'd, in RSVP order."""
+    event = _event_for_organizer(request, pk)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in ('csv', 'json'):
+        return HttpResponseBadRequest("format must be csv or json")
+    rows = (
+        RSVP.objects.filter(event_id=event.pk)
+        .order_by('created_at', 'id')
+        .values_list(*(column for _, column in EXPORT_COLUMNS))
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    if fmt == 'csv':
+        response = StreamingHttpResponse(_csv_rows(rows), content_type='text/csv; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(_json_rows(rows), content_type='application/json')
+    response['Content-Disposition'] = f'attachment; filename="event-{event.pk}-attendees.{fmt}"'
+    return response
+
+
+@require_POST
+@login_required
+def check_in(request, pk):
+    """
+    POST /event/<pk>/check-in/ with rsvp=<id>&rsvp=<id>...; undo=1 clears the
+    check-in instead. Only confirmed RSVPs of this event are touched, and
+    checking someone in twice keeps the first time.
+    """
+    event = _event_for_organizer(request, pk)
+    try:
+        ids = [int(value) for value in request.POST.getlist('rsvp')]
+    except ValueError:
+        return HttpResponseBadRequest("rsvp must be RSVP ids")
+    if not ids or len(ids) > MAX_CHECK_IN:
+        return HttpResponseBadRequest(f"Send between 1 and {MAX_CHECK_IN} RSVP ids")
+
+    rsvps = RSVP.objects.filter(event_id=event.pk, pk__in=ids, status=RSVP.CONFIRMED)
+    now = timezone.now()
+    if request.POST.get('undo'):
+        changed = rsvps.filter(checked_in_at__isnull=False).update(checked_in_at=None, updated_at=now)
+    else:
+        changed = rsvps.filter(checked_in_at__isnull=True).update(checked_in_at=now, updated_at=now)
+    return JsonResponse({'updated': changed})
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .mail import queue_rsvp_confirmation
+from .models import Event, RSVP
+
+
+def book_seat(event, user):
+    """
+    RSVPs the user to the event. Takes a seat if one is free, otherwise puts the
+    user on the waitlist. Returns (rsvp, created).
+
+    The RSVP is inserted as waitlisted first and only flipped to confirmed after
+    Event.objects.claim_seat() won a seat, so the counter signals never count it twice.
+    """
+    with transaction.atomic():
+        rsvp, created = RSVP.objects.get_or_create(
+            user=user, event=event, defaults={'status': RSVP.WAITLISTED}
+        )
+        if created and Event.objects.claim_seat(event.pk):
+            RSVP.objects.filter(pk=rsvp.pk).update(status=RSVP.CONFIRMED, updated_at=timezone.now())
+            rsvp.status = RSVP.CONFIRMED
+            queue_rsvp_confirmation(rsvp)
+    return rsvp, created
+
+
+def promote_waitlist(event_id):
+    """Moves people from the waitlist into free seats, first come first served."""
+    promoted = 0
+    while True:
+        with transaction.atomic():
+            # of=('self',): locking the joined event row too would skip the RSVP
+            # whenever a booking or touch() holds that row
+            rsvp = (
+                RSVP.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(event_id=event_id, status=RSVP.WAITLISTED)
+                .select_related('user', 'event')
+                .order_by('created_at', 'id')
+                .first()
+            )
+            if rsvp is None or not Event.objects.claim_seat(event_id):
+                return promoted
+            RSVP.objects.filter(pk=rsvp.pk).update(status=RSVP.CONFIRMED, updated_at=timezone.now())
+            rsvp.status = RSVP.CONFIRMED
+            queue_rsvp_confirmation(rsvp)
+            promoted += 1
@@ -0,0 +1,200 @@
+import datetime
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .helpers import aget_user, aget_user_roles, get_user_roles
+from .models import Category, Event
+
+# How long a rendered fragment is served before it's re-rendered, and how much
+# longer a stale copy may be handed out while one request re-renders it
+PAGE_CACHE_TIMEOUT = 300
+STALE_GRACE = 60
+LOCK_TIMEOUT = 10
+WAIT_STEP = 0.05
+# Fragments are keyed by the event's version, they never go stale, they only get evicted
+FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+
+def cached_render(key, render, timeout=None):
+    """
+    Returns the cached value of key, calling render() to fill it.
+
+    Only the request that gets the lock renders. When the key has expired the
+    others keep serving the old copy in the meantime; when there is no copy at
+    all they wait for the renderer instead of all rendering the same page at once.
+    Keys should include a version, so an old copy is never out of date, only old.
+    """
+    timeout = PAGE_CACHE_TIMEOUT if timeout is None else timeout
+    entry = cache.get(key)
+    if entry is not None:
+        fresh_until, value = entry
+        if time.time() < fresh_until or not _lock(key):
+            return value
+        return _fill(key, render, timeout)
+
+    if _lock(key):
+        return _fill(key, render, timeout)
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    # the renderer died or is very slow, don't hang the request
+    return render()
+
+
+def _lock(key):
+    return cache.add(f'{key}:lock', 1, LOCK_TIMEOUT)
+
+
+def _fill(key, render, timeout):
+    try:
+        value = render()
+        cache.set(key, (time.time() + timeout, value), timeout + STALE_GRACE)
+        return value
+    finally:
+        cache.delete(f'{key}:lock')
+
+
+def fragment_key(name, event):
+    """
+    Cache key of a fragment that only depends on the event. Every change to the
+    event, its category or its RSVPs bumps event.version (see the signals and
+    EventQuerySet.touch()), which moves the fragment to a new key. Occurrences
+    of a series that aren't stored are keyed by the series' version and the date.
+    Times are shown in the user's time zone, which is part of the key too.
+    """
+    tz = timezone.get_current_timezone_name()
+    if event.pk is None:
+        return f'{name}:s{event.series_id}-{event.occurrence_date:%Y%m%d}:v{event.version}:{tz}'
+    return f'{name}:{event.pk}:v{event.version}:{tz}'
+
+
+def render_fragments(name, template, events, **context):
+    """
+    Renders template once per event with {'e': event, **context}, reusing cached
+    copies. One get_many and at most one set_many per call, however many events.
+    """
+    events = list(events)
+    suffix = ''.join(f':{k}={v}' for k, v in sorted(context.items()))
+    keys = [fragment_key(name, event) + suffix for event in events]
+    cached = cache.get_many(keys)
+    rendered = {}
+    for key, event in zip(keys, events):
+        if key not in cached and key not in rendered:
+            rendered[key] = render_to_string(template, {'e': event, **context})
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_TIMEOUT)
+    return [cached[key] if key in cached else rendered[key] for key in keys]
+
+
+def _viewer_hash(request, user, roles):
+    raw = (
+        f"{user.pk or 0}:{user.is_superuser}:{','.join(sorted(roles))}"
+        f":{request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')}:{timezone.get_current_timezone_name()}"
+    )
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def viewer_tag(request):
+    """
+    Short hash of who is looking: the user, their roles, their CSRF cookie and time zone.
+    Part of the ETag of pages with per-user content, so a 304 never hands one
+    user's page (or a form with an old CSRF token) to someone else.
+    """
+    return _viewer_hash(request, request.user, get_user_roles(request.user))
+
+
+async def aviewer_tag(request):
+    user = await aget_user(request)
+    return _viewer_hash(request, user, await aget_user_roles(user))
+
+
+# Every change that shows up in the event list moves max(updated_at) or the count
+TABLE_STATE = {'n': Count('id'), 'last': Max('updated_at')}
+
+
+def event_list_state(request):
+    # One row per table, memoized on the request for the ETag and Last-Modified.
+    # A change to a recurring event moves its category's updated_at (see signals.py).
+    if not hasattr(request, '_event_list_state'):
+        request._event_list_state = (
+            Event.objects.aggregate(**TABLE_STATE), Category.objects.aggregate(**TABLE_STATE),
+        )
+    return request._event_list_state
+
+
+async def aevent_list_state(request):
+    if not hasattr(request, '_event_list_state'):
+        request._event_list_state = (
+            await Event.objects.aaggregate(**TABLE_STATE), await Category.objects.aaggregate(**TABLE_STATE),
+        )
+    return request._event_list_state
+
+
+def _list_tag(request, state):
+    tables = ':'.join(f"{table['n']}:{table['last']}" for table in state)
+    # the recurring events are shown up to a horizon that moves every day
+    raw = f"{tables}:{timezone.localdate()}:{request.GET.urlencode()}"
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+def _last_modified(state):
+    return max(filter(None, (table['last'] for table in state)), default=None)
+
+
+def event_list_tag(request):
+    """Hash of the event/category tables' state and the query string (filters, cursor)."""
+    return _list_tag(request, event_list_state(request))
+
+
+async def aevent_list_tag(request):
+    return _list_tag(request, await aevent_list_state(request))
+
+
+def event_list_last_modified(request, *args, **kwargs):
+    return _last_modified(event_list_state(request))
+
+
+async def aevent_list_last_modified(request, *args, **kwargs):
+    return _last_modified(await aevent_list_state(request))
+
+
+def acondition(etag_func=None, last_modified_func=None):
+    """
+    django.views.decorators.http.condition() for async views. That one calls
+    etag_func / last_modified_func synchronously, which can't query the database
+    from an async view; here they are coroutines and are awaited.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            last_modified = await last_modified_func(request, *args, **kwargs) if last_modified_func else None
+            if last_modified:
+                if not timezone.is_aware(last_modified):
+                    last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+                last_modified = int(last_modified.timestamp())
+            etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            etag = quote_etag(etag) if etag is not None else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
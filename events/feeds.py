@@ -0,0 +1,266 @@
+"""
+iCalendar (.ics) feeds that calendar apps subscribe to and poll.
+
+Calendar apps can't log in, so the personal feed lives at a signed URL that only
+its owner knows. Rows are read with .values().iterator() and written out one
+VEVENT at a time; the finished body is cached under the feed's content version,
+which is also its ETag, so most polls are a 304 or a single cache hit.
+"""
+import datetime
+import hashlib
+import heapq
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import condition, require_safe
+
+from .models import Category, Event, RSVP
+from .occurrences import horizon, series_between, virtual_occurrences
+
+FEED_SALT = 'events.feeds.rsvps'
+# how far back the feeds go, calendar apps keep what they already have
+FEED_PAST_DAYS = 30
+FEED_CACHE_TIMEOUT = 60 * 60
+# for events without ends_at, calendar apps need an end
+EVENT_DURATION = datetime.timedelta(hours=2)
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+EVENT_COLUMNS = (
+    'id', 'name', 'description', 'starts_at', 'ends_at', 'location', 'category__name', 'version', 'updated_at',
+    'series', 'occurrence_date',
+)
+
+
+def feed_token(user):
+    """The signed part of a user's feed URL; anyone with it can read their calendar."""
+    return signing.Signer(salt=FEED_SALT).sign(str(user.pk))
+
+
+def feed_user_id(token):
+    try:
+        return int(signing.Signer(salt=FEED_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def rsvp_feed_url(request, user):
+    return request.build_absolute_uri(reverse('rsvp_feed', args=[feed_token(user)]))
+
+
+# ------------------------ ICALENDAR ------------------------
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    # RFC 5545 3.1: lines longer than 75 octets continue on the next one after a space
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line + '\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        # don't cut a UTF-8 sequence in half
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode())
+        start, limit = end, 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _uid(field):
+    # an occurrence of a series keeps its UID when it gets stored, so calendar
+    # apps update it instead of showing it twice
+    if field('series'):
+        return f"event-s{field('series')}-{field('occurrence_date'):%Y%m%d}"
+    return f"event-{field('id')}"
+
+
+def _url(request, field):
+    if field('id') is None:
+        args = [field('series'), field('occurrence_date').isoformat()]
+        return request.build_absolute_uri(reverse('occurrence_detail', args=args))
+    return request.build_absolute_uri(reverse('event_detail', args=[field('id')]))
+
+
+def _vevent(request, row, prefix='', status='CONFIRMED'):
+    field = lambda name: row[f'{prefix}{name}']
+    starts = field('starts_at')
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{_uid(field)}@{request.get_host().split(':')[0]}",
+        f"DTSTAMP:{_utc(field('updated_at'))}",
+        f"SEQUENCE:{field('version')}",
+        f"DTSTART:{_utc(starts)}",
+        f"DTEND:{_utc(field('ends_at') or starts + EVENT_DURATION)}",
+        f"SUMMARY:{_escape(field('name'))}",
+        f"LOCATION:{_escape(field('location'))}",
+        f"DESCRIPTION:{_escape(field('description'))}",
+        f"CATEGORIES:{_escape(field('category__name'))}",
+        f"URL:{_url(request, field)}",
+        f"STATUS:{status}",
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+def _calendar(name, events):
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Event Management System//Events//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+    ))
+    yield from events
+    yield 'END:VCALENDAR\r\n'
+
+
+def _cached_feed(key, chunks):
+    """The cached body of key, or a streamed response that caches it once complete."""
+    body = cache.get(key)
+    if body is not None:
+        return HttpResponse(body, content_type=CONTENT_TYPE)
+
+    def stream():
+        parts = []
+        for chunk in chunks():
+            parts.append(chunk)
+            yield chunk
+        cache.set(key, ''.join(parts), FEED_CACHE_TIMEOUT)
+
+    return StreamingHttpResponse(stream(), content_type=CONTENT_TYPE)
+
+
+def _feed_since():
+    return timezone.localdate() - datetime.timedelta(days=FEED_PAST_DAYS)
+
+
+def _version(*parts):
+    # the cutoff date is part of it, the window moves every day
+    raw = ':'.join(str(part) for part in (*parts, _feed_since()))
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+# ------------------------ MY RSVPS ------------------------
+
+def _rsvp_feed_state(request, token):
+    # one aggregate, memoized on the request for the ETag, Last-Modified and the view
+    if not hasattr(request, '_rsvp_feed'):
+        user_id = feed_user_id(token)
+        state = None
+        if user_id is not None:
+            state = RSVP.objects.filter(user_id=user_id, event__date__gte=_feed_since()).aggregate(
+                n=Count('id'), last=Max('updated_at'), event_last=Max('event__updated_at'),
+            )
+            state['user_id'] = user_id
+            state['version'] = _version(user_id, state['n'], state['last'], state['event_last'])
+        request._rsvp_feed = state
+    return request._rsvp_feed
+
+
+def _rsvp_feed_etag(request, token):
+    state = _rsvp_feed_state(request, token)
+    return state and f"rsvp-feed-{state['version']}"
+
+
+def _rsvp_feed_last_modified(request, token):
+    state = _rsvp_feed_state(request, token)
+    return state and max(filter(None, (state['last'], state['event_last'])), default=None)
+
+
+@require_safe
+@condition(etag_func=_rsvp_feed_etag, last_modified_func=_rsvp_feed_last_modified)
+def rsvp_feed(request, token):
+    """GET /feeds/rsvps/<token>.ics: the events the token's owner RSVP'd to."""
+    state = _rsvp_feed_state(request, token)
+    if state is None:
+        raise Http404("Unknown feed")
+
+    def chunks():
+        rows = (
+            RSVP.objects.filter(user_id=state['user_id'], event__date__gte=_feed_since())
+            .order_by('event__starts_at', 'id')
+            .values('status', *(f'event__{column}' for column in EVENT_COLUMNS))
+            .iterator()
+        )
+        events = (
+            _vevent(request, row, 'event__', 'CONFIRMED' if row['status'] == RSVP.CONFIRMED else 'TENTATIVE')
+            for row in rows
+        )
+        return _calendar("My events", events)
+
+    return _cached_feed(f"ics:rsvps:{state['user_id']}:{state['version']}:{request.get_host()}", chunks)
+
+
+# ------------------------ CATEGORIES ------------------------
+
+def _category_feed_state(request, pk):
+    if not hasattr(request, '_category_feed'):
+        recent = Q(events__date__gte=_feed_since())
+        # the category's name and its events' state in one row
+        state = (
+            Category.objects.filter(pk=pk)
+            .annotate(n=Count('events', filter=recent), event_last=Max('events__updated_at', filter=recent))
+            .values('name', 'updated_at', 'n', 'event_last')
+            .first()
+        )
+        if state is not None:
+            # updated_at also moves with the category's recurring events (see signals.py)
+            state['version'] = _version(pk, state['updated_at'], state['n'], state['event_last'])
+        request._category_feed = state
+    return request._category_feed
+
+
+def _category_feed_etag(request, pk):
+    state = _category_feed_state(request, pk)
+    return state and f"category-feed-{pk}-{state['version']}"
+
+
+def _category_feed_last_modified(request, pk):
+    state = _category_feed_state(request, pk)
+    return state and max(filter(None, (state['updated_at'], state['event_last'])), default=None)
+
+
+def _occurrence_row(event):
+    row = {column: getattr(event, column, None) for column in EVENT_COLUMNS}
+    row.update({'id': None, 'category__name': event.category.name, 'series': event.series_id})
+    return row
+
+
+@require_safe
+@condition(etag_func=_category_feed_etag, last_modified_func=_category_feed_last_modified)
+def category_feed(request, pk):
+    """GET /feeds/categories/<pk>.ics: every recent and upcoming event of a category."""
+    state = _category_feed_state(request, pk)
+    if state is None:
+        raise Http404("No such category")
+
+    def chunks():
+        since = _feed_since()
+        rows = (
+            Event.objects.filter(category_id=pk, date__gte=since)
+            .order_by('starts_at', 'id')
+            .values(*EVENT_COLUMNS)
+            .iterator()
+        )
+        # the recurring events' occurrences that aren't stored, up to the horizon
+        series = series_between(since, horizon(), category=pk)
+        virtual = [_occurrence_row(e) for e in virtual_occurrences(series, since, horizon())]
+        rows = heapq.merge(rows, virtual, key=lambda row: row['starts_at'])
+        return _calendar(state['name'], (_vevent(request, row) for row in rows))
+
+    return _cached_feed(f"ics:category:{pk}:{state['version']}:{request.get_host()}", chunks)
@@ -0,0 +1,181 @@
+"""
+Static files and uploads, served by Django when there is no web server in front
+that does it (see the urls in event_management_system/urls.py).
+
+- picks the precompressed .br / .gz written by collectstatic (events/storage.py)
+  from Accept-Encoding instead of compressing per request;
+- answers single byte Range requests, for video and resumed downloads;
+- content-hashed static names are cached for a year as immutable;
+- with SENDFILE_BACKEND set, only the headers come from Python and the proxy
+  sends the bytes (nginx: X-Accel-Redirect, Apache / lighttpd: X-Sendfile).
+"""
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# (Content-Encoding, file suffix), preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+CHUNK_SIZE = 64 * 1024
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = re.search(r'q=([\d.]+)', params)
+        if coding and not (q and float(q.group(1)) == 0):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive, None to send the whole file, or False if unsatisfiable."""
+    match = RANGE_RE.fullmatch(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None  # several ranges or garbage: the whole file is a valid answer
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read(f, length):
+    with f:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _set_headers(response, headers):
+    for name, value in headers.items():
+        response[name] = value
+
+
+def _sendfile(response, path, internal_url):
+    backend = getattr(settings, 'SENDFILE_BACKEND', '')
+    if backend == 'nginx':
+        response['X-Accel-Redirect'] = internal_url
+    elif backend == 'xsendfile':
+        response['X-Sendfile'] = str(path)
+    else:
+        return False
+    return True
+
+
+def serve_file(request, root, path, cache_control, internal_prefix=None):
+    """
+    Response for the file `path` under the directory `root`. internal_prefix is
+    the proxy's internal location for root, without it the bytes are sent here.
+    """
+    try:
+        fullpath = Path(safe_join(root, path))
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if not fullpath.is_file():
+        raise Http404("Not found")
+
+    # encoded variants are whole files, a Range asks for bytes of the original
+    served, encoding = fullpath, None
+    range_header = request.headers.get('Range')
+    if not range_header:
+        accepted = _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for coding, suffix in ENCODINGS:
+            variant = fullpath.with_name(fullpath.name + suffix)
+            if coding in accepted and variant.is_file():
+                served, encoding = variant, coding
+                break
+
+    stat = served.stat()
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+    last_modified = int(stat.st_mtime)
+    headers = {
+        'Cache-Control': cache_control,
+        'Vary': 'Accept-Encoding',
+        'Accept-Ranges': 'bytes',
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+    }
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        _set_headers(response, headers)
+        return response
+
+    content_type = mimetypes.guess_type(fullpath.name)[0] or 'application/octet-stream'
+    relative = served.relative_to(os.path.abspath(root)).as_posix() if internal_prefix else None
+    if relative is not None:
+        response = HttpResponse(content_type=content_type)
+        if _sendfile(response, served, internal_prefix + relative):
+            # the proxy does the Range requests itself
+            _set_headers(response, headers)
+            if encoding:
+                response['Content-Encoding'] = encoding
+            return response
+
+    byte_range = _byte_range(range_header, stat.st_size) if range_header else None
+    if range_header and request.headers.get('If-Range', etag) != etag:
+        byte_range = None
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+    elif byte_range:
+        start, end = byte_range
+        f = served.open('rb')
+        f.seek(start)
+        response = StreamingHttpResponse(_read(f, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(served.open('rb'), content_type=content_type)
+        # FileResponse names the download after the file, which may be the .gz
+        del response['Content-Disposition']
+        if encoding:
+            response['Content-Encoding'] = encoding
+    _set_headers(response, headers)
+    return response
+
+
+def _internal_prefix(name):
+    prefix = getattr(settings, 'SENDFILE_NGINX_PREFIX', '/internal/')
+    return f'{prefix}{name}/'
+
+
+@require_safe
+def serve_static(request, path):
+    """STATIC_URL<path>: the collected files, or the source files before collectstatic."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if not hashed_files:
+        found = finders.find(path)
+        if not found:
+            raise Http404("Not found")
+        return serve_file(request, Path(found).parent, Path(found).name, 'no-cache')
+    # only the hashed names are safe to cache forever, css/output.css changes in place
+    cache_control = IMMUTABLE if path in hashed_files.values() else 'no-cache'
+    return serve_file(request, settings.STATIC_ROOT, path, cache_control, _internal_prefix('static'))
+
+
+@require_safe
+def serve_media(request, path):
+    """MEDIA_URL<path>: uploads and their image variants."""
+    # upload names are never reused, but the defaults and the variants are rewritten in place
+    cache_control = f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 86400)}"
+    return serve_file(request, settings.MEDIA_ROOT, path, cache_control, _internal_prefix('media'))
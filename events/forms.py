@@ -109,7 +109,8 @@
 
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
-from .models import CustomUser, Event, Category, RSVP
+from django.utils import timezone
+from .models import CustomUser, Event, EventSeries, Category, RSVP, day_bounds, event_start
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -189,7 +190,7 @@ class CustomUserChangeForm(UserChangeForm):
 class EventForm(forms.ModelForm):
     class Meta:
         model = Event
-        fields = ['name', 'description', 'date', 'time', 'location', 'category', 'image']
+        fields = ['name', 'description', 'date', 'time', 'ends_at', 'location', 'category', 'capacity', 'image']
         widgets = {
             'name': forms.TextInput(attrs={
                 'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
@@ -207,6 +208,10 @@ class EventForm(forms.ModelForm):
                 'type': 'time',
                 'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
             }),
+            'ends_at': forms.DateTimeInput(format='%Y-%m-%dT%H:%M', attrs={
+                'type': 'datetime-local',
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+            }),
             'location': forms.TextInput(attrs={
                 'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
                 'placeholder': 'Give Event Location'
@@ -214,12 +219,88 @@ class EventForm(forms.ModelForm):
             'category': forms.Select(attrs={
                 'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
             }),
+            'capacity': forms.NumberInput(attrs={
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+                'placeholder': 'Maximum number of participants'
+            }),
             'image': forms.FileInput(attrs={
                 'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
             }),
         }
 
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # date and time are entered on the organizer's clock, the active time
+        # zone (see TimezoneMiddleware); show a saved event's start the same way
+        if self.instance.pk:
+            start = timezone.localtime(self.instance.starts_at)
+            self.initial.update(date=start.date(), time=start.time())
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # starts_at itself is set from date and time by Event.save(); ends_at
+        # was parsed in the active zone too
+        day, time, ends_at = (cleaned_data.get(name) for name in ('date', 'time', 'ends_at'))
+        if day and time and ends_at and ends_at <= event_start(day, time, timezone.get_current_timezone_name()):
+            self.add_error('ends_at', "The event must end after it starts.")
+        return cleaned_data
+
+    def save(self, commit=True):
+        self.instance.time_zone = timezone.get_current_timezone_name()
+        return super().save(commit)
+
+
+class EventSeriesForm(forms.ModelForm):
+    class Meta:
+        model = EventSeries
+        fields = ['name', 'description', 'starts_on', 'time', 'rule', 'location', 'category', 'capacity']
+        widgets = {
+            'name': forms.TextInput(attrs={
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+                'placeholder': 'Enter an Event name'
+            }),
+            'description': forms.Textarea(attrs={
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+                'placeholder': 'Give some description about event'
+            }),
+            'starts_on': forms.DateInput(attrs={
+                'type': 'date',
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+            }),
+            'time': forms.TimeInput(attrs={
+                'type': 'time',
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+            }),
+            'rule': forms.TextInput(attrs={
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+                'placeholder': 'FREQ=WEEKLY;BYDAY=MO,WE',
+            }),
+            'location': forms.TextInput(attrs={
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+                'placeholder': 'Give Event Location'
+            }),
+            'category': forms.Select(attrs={
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+            }),
+            'capacity': forms.NumberInput(attrs={
+                'class': 'w-full border px-3 py-2 rounded focus:outline-none focus:ring focus:border-blue-300',
+                'placeholder': 'Maximum number of participants'
+            }),
+        }
+
+    def save(self, commit=True):
+        # starts_on and time are on the organizer's clock, like EventForm's
+        self.instance.time_zone = timezone.get_current_timezone_name()
+        return super().save(commit)
+
+
+class EventImportForm(EventForm):
+    """EventForm without the category select and image upload, import_events resolves categories itself."""
+    class Meta(EventForm.Meta):
+        fields = ['name', 'description', 'date', 'time', 'location', 'capacity']
+
+
 class CategoryForm(forms.ModelForm):
     class Meta:
         model = Category
@@ -240,3 +321,33 @@ class RSVPForm(forms.ModelForm):
     class Meta:
         model = RSVP
         fields = []
+
+
+class EventFilterForm(forms.Form):
+    """
+    Validates the search/filter fields submitted by event_list.html (q, category, from, to)
+    and turns them into SQL filters. Invalid values are simply ignored.
+    """
+    q = forms.CharField(required=False, max_length=200)
+    category = forms.IntegerField(required=False, min_value=1)
+    to = forms.DateField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 'from' is a python keyword, so it can't be declared as a class attribute
+        self.fields['from'] = forms.DateField(required=False)
+
+    def filter(self, queryset):
+        self.is_valid()
+        data = self.cleaned_data
+        if data.get('q', '').strip():
+            # full-text match; the list keeps its date order for the keyset pagination
+            queryset = queryset.search(data['q'].strip(), ranked=False)
+        if data.get('category'):
+            queryset = queryset.filter(category_id=data['category'])
+        # whole days in the user's time zone, as a range on the starts_at index
+        if data.get('from'):
+            queryset = queryset.filter(starts_at__gte=day_bounds(data['from'])[0])
+        if data.get('to'):
+            queryset = queryset.filter(starts_at__lt=day_bounds(data['to'])[1])
+        return queryset
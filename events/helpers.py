@@ -1,18 +1,100 @@
+from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 
+
+ROLE_GROUPS = ('Admin', 'Organizer', 'Participant')
+
+# name -> pk of the role groups, filled once per process
+_group_ids = {}
+
+def ensure_groups(using='default', **kwargs):
+    """post_migrate hook (see apps.py): creates the role groups, so requests never have to."""
+    for name in ROLE_GROUPS:
+        Group.objects.using(using).get_or_create(name=name)
+    _group_ids.clear()
+
+def group_id(name):
+    pk = _group_ids.get(name)
+    if pk is None:
+        pk = _group_ids[name] = Group.objects.get_or_create(name=name)[0].pk
+    return pk
+
+def forget_group_ids():
+    _group_ids.clear()
+
+def _roles_cache_key(user_id):
+    return f'user-roles:{user_id}'
+
+def get_user_roles(user):
+    """
+    Names of the groups the user belongs to. Loaded with one query and kept on the
+    user object, so every role check in the same request reuses it. When
+    ROLE_CACHE_TIMEOUT is set the names are also cached across requests.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_role_names', None)
+    if roles is None:
+        timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+        if timeout:
+            roles = cache.get(_roles_cache_key(user.pk))
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            if timeout:
+                cache.set(_roles_cache_key(user.pk), roles, timeout)
+        user._role_names = roles
+    return roles
+
+async def aget_user_roles(user):
+    """get_user_roles() for async views; the result is kept on the user the same way."""
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_role_names', None)
+    if roles is None:
+        timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+        if timeout:
+            roles = await cache.aget(_roles_cache_key(user.pk))
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+            if timeout:
+                await cache.aset(_roles_cache_key(user.pk), roles, timeout)
+        user._role_names = roles
+    return roles
+
+def has_role(user, *group_names):
+    return not get_user_roles(user).isdisjoint(group_names)
+
+async def ahas_role(user, *group_names):
+    return not (await aget_user_roles(user)).isdisjoint(group_names)
+
+async def aget_user(request):
+    """
+    The logged-in user for async views. Also put back on request.user, so the
+    templates (rendered in a worker thread) don't load it a second time.
+    """
+    user = await request.auser()
+    request.user = user
+    return user
+
+def forget_user_roles(user_ids):
+    if getattr(settings, 'ROLE_CACHE_TIMEOUT', 0):
+        cache.delete_many([_roles_cache_key(pk) for pk in user_ids])
+
 def in_groups_required(*group_names):
     def check(user):
         if not user.is_authenticated:
             return False
         if user.is_superuser:
             return True
-        if user.groups.filter(name__in=group_names).exists():
+        if has_role(user, *group_names):
             return True
         return False
     return user_passes_test(check)
 
 def require_admin(user):
-    if user.is_superuser or user.groups.filter(name='Admin').exists():
+    if user.is_superuser or has_role(user, 'Admin'):
         return True
     raise PermissionDenied
@@ -0,0 +1,83 @@
+import logging
+import re
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+EVENT_IMAGE_WIDTHS = (480, 960)
+PROFILE_PICTURE_WIDTHS = (64, 128)
+FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+
+VARIANT_RE = re.compile(r'_\d+w\.(webp|jpg)$')
+
+
+def variant_name(name, width, ext):
+    """
+    events/images/party.png -> events/images/party-png_480w.webp. The original's
+    extension stays in the name, party.jpg next to it gets its own variants.
+    """
+    path = PurePosixPath(name)
+    stem = f'{path.stem}-{path.suffix[1:]}' if path.suffix else path.stem
+    return str(path.with_name(f'{stem}_{width}w.{ext}'))
+
+
+def srcset(fieldfile, widths, ext):
+    if not fieldfile:
+        return ''
+    storage = fieldfile.storage
+    return ', '.join(f'{storage.url(variant_name(fieldfile.name, w, ext))} {w}w' for w in widths)
+
+
+def variant_url(fieldfile, width, ext='jpg'):
+    if not fieldfile:
+        return ''
+    return fieldfile.storage.url(variant_name(fieldfile.name, width, ext))
+
+
+def has_variants(name, widths, storage=default_storage):
+    return storage.exists(variant_name(name, widths[-1], FORMATS[-1][0]))
+
+
+def generate_variants(name, widths, storage=default_storage):
+    """
+    Writes a resized WebP and JPEG copy of the image for every width, next to
+    the original. Returns the number of files written (0 if the original is
+    missing or isn't an image).
+    """
+    try:
+        with storage.open(name) as f:
+            original = ImageOps.exif_transpose(Image.open(f))
+            original.load()
+    except FileNotFoundError:
+        # e.g. the default picture when it was never uploaded to MEDIA_ROOT
+        logger.debug("Can't make variants of %s: file is missing", name)
+        return 0
+    except (OSError, ValueError) as exc:
+        logger.warning("Can't make variants of %s: %s", name, exc)
+        return 0
+
+    written = 0
+    for width in widths:
+        image = original.copy()
+        image.thumbnail((width, width * 4), Image.LANCZOS)  # never upscales
+        for ext, fmt in FORMATS:
+            out = image.convert('RGBA' if fmt == 'WEBP' and image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            buffer = BytesIO()
+            out.save(buffer, fmt, quality=80, optimize=True)
+            target = variant_name(name, width, ext)
+            # deterministic names: replace instead of letting storage add a suffix
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+def ensure_variants(fieldfile, widths):
+    if fieldfile and not has_variants(fieldfile.name, widths, fieldfile.storage):
+        generate_variants(fieldfile.name, widths, fieldfile.storage)
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 60
+
+
+def queue_email(subject, body, recipients, from_email=None):
+    """
+    Puts an email in the outbox once the current transaction commits, so the
+    request never waits on SMTP and nothing is queued for a rolled back signup/RSVP.
+    """
+    recipients = [r for r in recipients if r]
+    if not recipients:
+        return
+    transaction.on_commit(lambda: OutboundEmail.objects.create(
+        subject=subject, body=body, from_email=from_email or '', recipients=recipients,
+    ))
+
+
+def _retry_later(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboundEmail.FAILED
+    else:
+        # 1, 2, 4, 8 ... minutes
+        email.next_attempt_at = now + timedelta(seconds=BACKOFF_SECONDS * 2 ** (email.attempts - 1))
+
+
+def deliver_pending(batch_size=100):
+    """
+    Sends one batch of due outbox emails over a single mail connection.
+    Returns how many emails were picked up (sent or rescheduled).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets several workers drain the outbox side by side (ignored on SQLite)
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as exc:
+            for email in batch:
+                _retry_later(email, exc, now)
+        else:
+            try:
+                for email in batch:
+                    try:
+                        connection.send_messages([email.as_message(connection)])
+                    except Exception as exc:
+                        _retry_later(email, exc, now)
+                    else:
+                        email.status = OutboundEmail.SENT
+                        email.sent_at = timezone.now()
+                        email.attempts += 1
+            finally:
+                connection.close()
+
+        OutboundEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return len(batch)
+
+
+def queue_rsvp_confirmation(rsvp):
+    user, event = rsvp.user, rsvp.event
+    subject = f"RSVP Confirmed: {event.name}"
+    message = (
+        f"Hi {user.first_name or user.username},\n\n"
+        f"You have successfully RSVP’d to '{event.name}' on {event.date} at {event.time}.\n"
+        f"Location: {event.location}\n\nSee you there!"
+    )
+    queue_email(subject, message, [user.email], settings.DEFAULT_FROM_EMAIL)
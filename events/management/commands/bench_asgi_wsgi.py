@@ -0,0 +1,110 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+
+from .run_benchmarks import benchmark_routes, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares throughput of the same pages served through Django's ASGI handler "
+        "(what uvicorn / daphne run) and its WSGI handler (gunicorn style, one thread "
+        "per connection) at several numbers of concurrent connections. Run "
+        "seed_demo_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32', help='Comma separated numbers of connections')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route and concurrency level')
+        parser.add_argument('--routes', default='event_list,event_detail,event_detail_logged_in,admin_dashboard')
+        parser.add_argument('--user', help='Username for the logged-in routes (default: first superuser)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write("DEBUG is on, the debug toolbar and query logging will skew the numbers.")
+        levels = [int(n) for n in options['concurrency'].split(',')]
+        routes = benchmark_routes(options['user'], self.stderr.write)
+        wanted = [name for name in options['routes'].split(',') if name]
+        unknown = set(wanted) - set(routes)
+        if unknown:
+            raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}. Known: {', '.join(routes)}")
+
+        n = options['requests']
+        results = {}
+        self.stdout.write(
+            f"{'route':<24} {'conns':>5} {'wsgi req/s':>11} {'wsgi p95':>10} {'asgi req/s':>11} {'asgi p95':>10}"
+        )
+        for name in wanted:
+            url, cookies = routes[name]
+            for level in levels:
+                wsgi = self.run_wsgi(url, cookies, n, level)
+                asgi = asyncio.run(self.run_asgi(url, cookies, n, level))
+                results.setdefault(name, {})[level] = {'wsgi': wsgi, 'asgi': asgi}
+                self.stdout.write(
+                    f"{name:<24} {level:>5} {wsgi['throughput_rps']:>11.1f} {wsgi['p95_ms']:>8.1f}ms "
+                    f"{asgi['throughput_rps']:>11.1f} {asgi['p95_ms']:>8.1f}ms"
+                )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stderr.write(f"Results written to {options['output']}")
+
+    def run_wsgi(self, url, cookies, n, concurrency):
+        timings, errors = [], 0
+        lock = threading.Lock()
+        remaining = iter(range(n))
+
+        def connection_worker():
+            nonlocal errors
+            client = Client()
+            if cookies:
+                client.cookies.update(cookies)
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    with lock:
+                        timings.append(elapsed)
+                        errors += response.status_code != 200
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(connection_worker)
+        return summarize(timings, errors, time.perf_counter() - start)
+
+    async def run_asgi(self, url, cookies, n, concurrency):
+        timings, errors = [], 0
+        remaining = iter(range(n))
+
+        async def connection_worker():
+            nonlocal errors
+            client = AsyncClient()
+            if cookies:
+                client.cookies.update(cookies)
+            while next(remaining, None) is not None:
+                # like ASGIHandler: the sync parts of one request share a thread
+                async with ThreadSensitiveContext():
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(connection_worker() for _ in range(concurrency)))
+        return summarize(timings, errors, time.perf_counter() - start)
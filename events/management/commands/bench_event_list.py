@@ -0,0 +1,86 @@
+import random
+import statistics
+import time
+from datetime import date, time as dtime, timedelta
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from events.models import Category, Event
+from events.views import EventListView
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks EventListView while growing the Event table. "
+        "Runs inside a transaction that is rolled back, so no data is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,50000',
+                            help='Comma separated table sizes to measure at')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per measurement')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+        with transaction.atomic():
+            self.run(sizes, options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, sizes, repeat):
+        organizer = User(username='bench-organizer', is_active=True)
+        User.objects.bulk_create([organizer])
+        organizer = User.objects.get(username='bench-organizer')
+        categories = Category.objects.bulk_create(
+            [Category(name=f'bench-category-{i}') for i in range(10)]
+        )
+        async_view = EventListView.as_view()
+        factory = RequestFactory()
+
+        async def anonymous():
+            return AnonymousUser()
+
+        def view(request):
+            request.user, request.auser = AnonymousUser(), anonymous
+            return async_to_sync(async_view)(request)
+
+        def measure(params):
+            timings = []
+            for _ in range(repeat):
+                request = factory.get('/events/', params)
+                start = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - start) * 1000)
+            return statistics.median(timings), response
+
+        self.stdout.write(f"{'rows':>10} {'first page':>12} {'deep page':>12} {'category':>12} {'date range':>12}")
+        current, start_day = 0, date(2020, 1, 1)
+        for size in sizes:
+            batch = [
+                Event(
+                    name=f'Event {i}', description='benchmark', location=f'Hall {i % 50}',
+                    date=start_day + timedelta(days=random.randint(0, 3650)), time=dtime(18, 0),
+                    category=random.choice(categories), organizer=organizer,
+                )
+                for i in range(current, size)
+            ]
+            Event.objects.bulk_create(batch, batch_size=2000)
+            current = size
+
+            first, response = measure({})
+            # follow the cursor a few pages in, then time that page
+            cursor = response.context_data['page_obj'].next_cursor
+            for _ in range(5):
+                request = factory.get('/events/', {'after': cursor})
+                cursor = view(request).context_data['page_obj'].next_cursor or cursor
+            deep, _ = measure({'after': cursor})
+            by_category, _ = measure({'category': categories[0].pk})
+            by_range, _ = measure({'from': '2024-01-01', 'to': '2024-03-31'})
+            self.stdout.write(f"{size:>10} {first:>10.2f}ms {deep:>10.2f}ms {by_category:>10.2f}ms {by_range:>10.2f}ms")
@@ -0,0 +1,80 @@
+import random
+import statistics
+import time
+from datetime import date, time as dtime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from events.models import Category, Event
+
+User = get_user_model()
+
+WORDS = (
+    "jazz rock folk classical techno poetry python django startup cricket football chess "
+    "festival meetup workshop concert exhibition seminar marathon hackathon night live "
+    "dhaka chittagong khulna sylhet rajshahi barisal rangpur comilla gazipur narayanganj "
+    "community family charity annual summer winter spring open free outdoor indoor"
+).split()
+
+
+def sentence(n):
+    return ' '.join(random.choice(WORDS) for _ in range(n))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares full-text search against icontains on synthetic events. "
+        "Runs inside a transaction that is rolled back, so no data is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=10)
+        # common words let icontains stop early thanks to LIMIT, rare ones make it scan the table
+        parser.add_argument('--terms', default='jazz,dhaka festival,quasar,supernova gala,nomatch')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        User.objects.bulk_create([User(username='bench-organizer', is_active=True)])
+        organizer = User.objects.get(username='bench-organizer')
+        category = Category.objects.create(name='bench-category')
+        start = time.perf_counter()
+        Event.objects.bulk_create(
+            (
+                Event(
+                    name=sentence(3).title(), location=sentence(1).title(),
+                    description=sentence(30) + (' quasar supernova gala' if i % 5000 == 0 else ''),
+                    date=date(2025, 1, 1) + timedelta(days=i % 365), time=dtime(18, 0),
+                    category=category, organizer=organizer,
+                )
+                for i in range(options['events'])
+            ),
+            batch_size=5000,
+        )
+        self.stdout.write(f"Inserted {options['events']} events in {time.perf_counter() - start:.1f}s\n")
+
+        def measure(make_queryset):
+            timings = []
+            for _ in range(options['repeat']):
+                begin = time.perf_counter()
+                rows = list(make_queryset()[:24])
+                timings.append((time.perf_counter() - begin) * 1000)
+            return statistics.median(timings), len(rows)
+
+        self.stdout.write(f"{'term':<22} {'icontains':>12} {'full-text':>12} {'ranked':>12}")
+        for term in options['terms'].split(','):
+            words = term.split()
+            naive = Q()
+            for word in words:
+                naive &= Q(name__icontains=word) | Q(location__icontains=word) | Q(description__icontains=word)
+            icontains, _ = measure(lambda: Event.objects.filter(naive).order_by('-date', '-id'))
+            fts, _ = measure(lambda: Event.objects.search(term, ranked=False).order_by('-date', '-id'))
+            ranked, _ = measure(lambda: Event.objects.search(term))
+            self.stdout.write(f"{term:<22} {icontains:>10.2f}ms {fts:>10.2f}ms {ranked:>10.2f}ms")
@@ -0,0 +1,56 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand
+
+from events.models import Event
+
+FIELDS = ['name', 'description', 'date', 'time', 'location', 'category', 'capacity', 'organizer']
+COLUMNS = {'category': 'category__name', 'organizer': 'organizer__username'}
+
+
+class Command(BaseCommand):
+    help = "Exports all events as CSV, JSON Lines or JSON, streaming rows so memory use stays flat."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or - for stdout")
+        parser.add_argument('--format', choices=['csv', 'jsonl', 'json'], default='csv')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--category', help="Only export events of this category")
+
+    def rows(self, options):
+        queryset = Event.objects.order_by('pk')
+        if options['category']:
+            queryset = queryset.filter(category__name=options['category'])
+        values = queryset.values_list(*[COLUMNS.get(f, f) for f in FIELDS])
+        for row in values.iterator(chunk_size=options['chunk_size']):
+            yield dict(zip(FIELDS, row))
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            out = self.stdout
+            out.ending = ''  # rows already end with newlines
+        else:
+            out = open(options['path'], 'w', newline='', encoding='utf-8')
+        count = 0
+        try:
+            if options['format'] == 'csv':
+                writer = csv.DictWriter(out, fieldnames=FIELDS)
+                writer.writeheader()
+                for row in self.rows(options):
+                    writer.writerow(row)
+                    count += 1
+            else:
+                as_array = options['format'] == 'json'
+                out.write('[\n' if as_array else '')
+                for row in self.rows(options):
+                    if as_array and count:
+                        out.write(',\n')
+                    out.write(json.dumps(row, default=str))
+                    out.write('' if as_array else '\n')
+                    count += 1
+                out.write('\n]\n' if as_array else '')
+        finally:
+            if out is not self.stdout:
+                out.close()
+        self.stderr.write(f"Exported {count} event(s).")
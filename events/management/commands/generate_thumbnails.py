@@ -0,0 +1,51 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.images import (
+    EVENT_IMAGE_WIDTHS, PROFILE_PICTURE_WIDTHS, VARIANT_RE, generate_variants, has_variants,
+)
+
+FOLDERS = (
+    ('events', EVENT_IMAGE_WIDTHS),
+    ('users', PROFILE_PICTURE_WIDTHS),
+)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+def _generate(job):
+    name, widths = job
+    return name, generate_variants(name, widths)
+
+
+class Command(BaseCommand):
+    help = "Creates the resized WebP/JPEG variants for images uploaded before variants existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+
+    def find_jobs(self, force):
+        for folder, widths in FOLDERS:
+            for root, _dirs, files in os.walk(os.path.join(settings.MEDIA_ROOT, folder)):
+                for filename in files:
+                    if not filename.lower().endswith(IMAGE_EXTENSIONS) or VARIANT_RE.search(filename):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), settings.MEDIA_ROOT)
+                    name = name.replace(os.sep, '/')
+                    if force or not has_variants(name, widths):
+                        yield name, widths
+
+    def handle(self, *args, **options):
+        jobs = list(self.find_jobs(options['force']))
+        if not jobs:
+            self.stdout.write("All images already have variants.")
+            return
+        # django.setup as initializer so it also works with the spawn start method
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            for name, written in pool.map(_generate, jobs, chunksize=4):
+                self.stdout.write(f"{name}: {written} variant(s)")
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(jobs)} image(s)."))
@@ -0,0 +1,105 @@
+import csv
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from events.forms import EventImportForm
+from events.models import Category, Event
+from events.stats import forget_dashboard_stats
+
+User = get_user_model()
+
+
+def read_rows(stream, fmt):
+    """Yields one dict per event without loading the whole feed (except plain JSON arrays)."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from json.load(stream)
+
+
+def guess_format(path):
+    for fmt in ('csv', 'jsonl', 'json'):
+        if path.endswith('.' + fmt):
+            return fmt
+    return 'csv'
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports events from a CSV, JSON Lines or JSON feed. Columns: name, description, "
+        "date, time, location, category, capacity (optional)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or - for stdin")
+        parser.add_argument('--organizer', required=True, help="Username that will own the imported events")
+        parser.add_argument('--format', choices=['csv', 'jsonl', 'json'])
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-categories', action='store_true',
+                            help="Create categories that don't exist yet instead of rejecting the row")
+
+    def handle(self, *args, **options):
+        try:
+            organizer = User.objects.get(username=options['organizer'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['organizer']!r}")
+        fmt = options['format'] or guess_format(options['path'])
+        self.categories = dict(Category.objects.values_list('name', 'pk'))
+        self.create_categories = options['create_categories']
+
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        imported = rejected = 0
+        batch = []
+        try:
+            for number, row in enumerate(read_rows(stream, fmt), start=1):
+                event = self.build(number, row, organizer)
+                if event is None:
+                    rejected += 1
+                    continue
+                batch.append(event)
+                if len(batch) >= options['batch_size']:
+                    imported += self.flush(batch)
+                    batch = []
+            imported += self.flush(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            forget_dashboard_stats()
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} event(s), rejected {rejected}."))
+
+    def build(self, number, row, organizer):
+        form = EventImportForm({k: v for k, v in row.items() if v not in (None, '')})
+        errors = {} if form.is_valid() else {field: list(msgs) for field, msgs in form.errors.items()}
+        category_id = self.category_id((row.get('category') or '').strip())
+        if category_id is None:
+            errors['category'] = [f"Unknown category {row.get('category')!r}."]
+        if errors:
+            self.stderr.write(f"Row {number}: {json.dumps(errors)}")
+            return None
+        event = form.save(commit=False)
+        event.category_id = category_id
+        event.organizer = organizer
+        return event
+
+    def category_id(self, name):
+        if not name:
+            return None
+        if name not in self.categories and self.create_categories:
+            self.categories[name] = Category.objects.get_or_create(name=name)[0].pk
+        return self.categories.get(name)
+
+    def flush(self, batch):
+        if not batch:
+            return 0
+        with transaction.atomic():
+            Event.objects.bulk_create(batch)
+        return len(batch)
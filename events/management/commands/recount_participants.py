@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q
+
+from events.models import Event, RSVP
+
+
+class Command(BaseCommand):
+    help = "Repairs Event.participant_count where it drifted from the real number of confirmed RSVPs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drifted events')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drifted = (
+            Event.objects.annotate(actual=Count('rsvps', filter=Q(rsvps__status=RSVP.CONFIRMED)))
+            .exclude(participant_count=F('actual'))
+            .values_list('pk', 'participant_count', 'actual')
+        )
+        batch, fixed = [], 0
+        for pk, stored, actual in drifted.iterator(chunk_size=options['batch_size']):
+            self.stdout.write(f"Event {pk}: stored {stored}, actual {actual}")
+            batch.append(pk)
+            if len(batch) >= options['batch_size']:
+                fixed += self.fix(batch, options['dry_run'])
+                batch = []
+        fixed += self.fix(batch, options['dry_run'])
+        verb = "would be repaired" if options['dry_run'] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} event(s) {verb}."))
+
+    def fix(self, pks, dry_run):
+        if dry_run or not pks:
+            return len(pks)
+        # recounted inside the UPDATE, so RSVPs made meanwhile are not lost
+        return Event.objects.filter(pk__in=pks).recount_participants()
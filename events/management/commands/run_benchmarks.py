@@ -0,0 +1,202 @@
+import json
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from events.models import Event
+
+User = get_user_model()
+
+
+def percentile(sorted_values, p):
+    # nearest rank, good enough for a few hundred samples
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(timings, errors, elapsed, queries=None):
+    timings = sorted(timings)
+    result = {
+        'requests': len(timings),
+        'errors': errors,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+    }
+    if queries:
+        result['queries'] = max(queries)
+    return result
+
+
+def benchmark_routes(username=None, warn=None):
+    """
+    {name: (url, cookies)} of the pages worth measuring. Logged-in routes use one
+    session of `username` (default: the first superuser) and are left out if
+    there is no such user.
+    """
+    anonymous = None
+    event = Event.objects.order_by('-participant_count', 'pk').first()
+    routes = {'event_list': (reverse('event_list'), anonymous)}
+    if event:
+        word = event.name.split()[0]
+        routes['event_list_search'] = (f"{reverse('event_list')}?q={word}", anonymous)
+        routes['event_list_category'] = (f"{reverse('event_list')}?category={event.category_id}", anonymous)
+        routes['event_detail'] = (reverse('event_detail', args=[event.pk]), anonymous)
+
+    if username:
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f"No user named {username!r}.")
+    else:
+        user = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+    if user is None:
+        if warn:
+            warn("No superuser found, skipping the logged-in routes (use --user).")
+        return routes
+
+    # one session shared by all threads
+    client = Client()
+    client.force_login(user)
+    cookies = client.cookies
+    if event:
+        routes['event_detail_logged_in'] = (reverse('event_detail', args=[event.pk]), cookies)
+    for name in ('my_events', 'participant_dashboard', 'organizer_dashboard', 'admin_dashboard', 'category_list'):
+        routes[name] = (reverse(name), cookies)
+    return routes
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives the main pages with the Django test client from several threads and "
+        "reports p50/p95/p99 latency, throughput and queries per route. Run "
+        "seed_demo_data first. Results can be saved as JSON and compared to an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=100, help='Requests per route')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per route')
+        parser.add_argument('--routes', default='', help='Comma separated route names (default: all)')
+        parser.add_argument('--user', help='Username for the logged-in routes (default: first superuser)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='JSON file of an earlier run to compare against')
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help='Fail if any p95 got more than this many percent slower than --compare')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write("DEBUG is on, the debug toolbar and query logging will skew the numbers.")
+        routes = benchmark_routes(options['user'], self.stderr.write)
+        if options['routes']:
+            wanted = options['routes'].split(',')
+            unknown = set(wanted) - set(routes)
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}. Known: {', '.join(routes)}")
+            routes = {name: routes[name] for name in wanted}
+
+        results = {}
+        self.stdout.write(
+            f"{'route':<24} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8} {'queries':>8} {'errors':>7}"
+        )
+        for name, (url, cookies) in routes.items():
+            results[name] = self.run_route(url, cookies, options['requests'], options['threads'], options['warmup'])
+            r = results[name]
+            self.stdout.write(
+                f"{name:<24} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms "
+                f"{r['throughput_rps']:>8.1f} {r['queries']:>8} {r['errors']:>7}"
+            )
+
+        report = {'meta': self.meta(options), 'routes': results}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stderr.write(f"Results written to {options['output']}")
+        if options['compare']:
+            self.compare(results, options['compare'], options['max_regression'])
+
+    def run_route(self, url, cookies, n, threads, warmup):
+        timings, queries = [], []
+        errors = 0
+        lock = threading.Lock()
+        # spread n requests over the threads
+        shares = [n // threads + (1 if i < n % threads else 0) for i in range(threads)]
+
+        def worker(share):
+            nonlocal errors
+            client = Client()
+            if cookies:
+                client.cookies.update(cookies)
+            try:
+                for _ in range(warmup if share else 0):
+                    client.get(url)
+                for _ in range(share):
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        response = client.get(url)
+                        elapsed = (time.perf_counter() - start) * 1000
+                    with lock:
+                        timings.append(elapsed)
+                        queries.append(len(ctx.captured_queries))
+                        if response.status_code != 200:
+                            errors += 1
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(worker, shares))
+        return summarize(timings, errors, time.perf_counter() - start, queries)
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'date': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'debug': settings.DEBUG,
+            'threads': options['threads'],
+            'requests': options['requests'],
+            'events': Event.objects.count(),
+            'users': User.objects.count(),
+        }
+
+    def compare(self, results, path, max_regression):
+        with open(path) as f:
+            baseline = json.load(f)
+        self.stdout.write(f"\nCompared to {path} (commit {baseline['meta'].get('commit')}):")
+        self.stdout.write(f"{'route':<24} {'p50':>9} {'p95':>9} {'queries':>9}")
+        regressed = []
+        for name, r in results.items():
+            old = baseline['routes'].get(name)
+            if not old:
+                self.stdout.write(f"{name:<24} {'new':>9}")
+                continue
+            p50 = (r['p50_ms'] / old['p50_ms'] - 1) * 100 if old['p50_ms'] else 0
+            p95 = (r['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0
+            self.stdout.write(
+                f"{name:<24} {p50:>+8.1f}% {p95:>+8.1f}% {r['queries'] - old['queries']:>+9}"
+            )
+            if (max_regression is not None and p95 > max_regression) or r['queries'] > old['queries']:
+                regressed.append(name)
+        if regressed and max_regression is not None:
+            raise CommandError(f"Regressed: {', '.join(regressed)}")
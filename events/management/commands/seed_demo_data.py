@@ -0,0 +1,159 @@
+import random
+import time
+from datetime import time as dtime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from events.models import Category, Event, RSVP
+from events.stats import forget_dashboard_stats
+
+User = get_user_model()
+
+WORDS = [
+    'jazz', 'rock', 'tech', 'python', 'startup', 'design', 'food', 'film', 'chess', 'yoga',
+    'poetry', 'photography', 'robotics', 'marathon', 'football', 'cricket', 'charity', 'art',
+    'career', 'book', 'coffee', 'hackathon', 'science', 'music', 'dance', 'comedy', 'travel',
+]
+KINDS = ['Night', 'Meetup', 'Workshop', 'Festival', 'Conference', 'Talk', 'Fair', 'Club', 'Session']
+CITIES = ['Dhaka', 'Chattogram', 'Sylhet', 'Khulna', 'Rajshahi', 'Barishal', 'Rangpur', 'Cumilla']
+
+
+def zipf_weights(n, s=1.1):
+    # a few items get most of the traffic, like real categories, organizers and events
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the database with synthetic users, categories, events and RSVPs for "
+        "benchmarks. Popularity is skewed: a few categories, organizers and events "
+        "get most of the events and RSVPs. Everything is inserted with bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--events', type=int, default=10000)
+        parser.add_argument('--rsvps', type=int, default=100000, help='Roughly how many RSVPs to create')
+        parser.add_argument('--organizers', type=float, default=0.02, help='Share of users that organize events')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for repeatable data')
+        parser.add_argument('--prefix', default='demo', help='Prefix of the generated usernames and categories')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['categories'] < 1:
+            raise CommandError("Need at least one user and one category.")
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        started = time.perf_counter()
+
+        users = self.create_users(options['users'], options['organizers'])
+        categories = self.create_categories(options['categories'])
+        organizers = users[:max(1, int(len(users) * options['organizers']))]
+        events = self.create_events(options['events'], categories, organizers)
+        rsvps = self.create_rsvps(options['rsvps'], events, users)
+        forget_dashboard_stats()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users, {len(categories)} categories, {len(events)} events "
+            f"and {rsvps} RSVPs in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def create_users(self, n, organizer_share):
+        start = User.objects.filter(username__startswith=f'{self.prefix}-user').count()
+        # hashing is slow on purpose, every demo user gets the same password
+        password = make_password('demo12345')
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f'{self.prefix}-user{start + i}', email=f'{self.prefix}-user{start + i}@example.com',
+                    first_name=self.rng.choice(WORDS).title(), password=password, is_active=True,
+                )
+                for i in range(n)
+            ],
+            batch_size=self.batch_size,
+        )
+        organizer_group, _ = Group.objects.get_or_create(name='Organizer')
+        participant_group, _ = Group.objects.get_or_create(name='Participant')
+        n_organizers = max(1, int(n * organizer_share))
+        Membership = User.groups.through
+        Membership.objects.bulk_create(
+            [
+                Membership(customuser_id=user.pk, group_id=(organizer_group if i < n_organizers else participant_group).pk)
+                for i, user in enumerate(users)
+            ],
+            batch_size=self.batch_size,
+        )
+        return users
+
+    def create_categories(self, n):
+        names = [f'{self.prefix} {word.title()}' for word in WORDS]
+        names += [f'{self.prefix} Category {i}' for i in range(len(names), n)]
+        existing = set(Category.objects.filter(name__in=names[:n]).values_list('name', flat=True))
+        Category.objects.bulk_create(
+            [Category(name=name, description=f'All things {name.lower()}') for name in names[:n] if name not in existing]
+        )
+        return list(Category.objects.filter(name__in=names[:n]).order_by('pk'))
+
+    def create_events(self, n, categories, organizers):
+        today = timezone.localdate()
+        category_weights = zipf_weights(len(categories))
+        organizer_weights = zipf_weights(len(organizers))
+        created = []
+        for offset in range(0, n, self.batch_size):
+            batch = []
+            for _ in range(offset, min(n, offset + self.batch_size)):
+                # mostly the coming weeks, with a long tail in both directions
+                days = int(self.rng.gauss(20, 120))
+                batch.append(Event(
+                    name=f'{self.rng.choice(WORDS).title()} {self.rng.choice(KINDS)}',
+                    description=' '.join(self.rng.choices(WORDS, k=30)),
+                    date=today + timedelta(days=days),
+                    time=dtime(self.rng.randint(8, 22), self.rng.choice([0, 15, 30, 45])),
+                    location=f'{self.rng.choice(CITIES)} Hall {self.rng.randint(1, 40)}',
+                    category=self.rng.choices(categories, category_weights)[0],
+                    organizer=self.rng.choices(organizers, organizer_weights)[0],
+                    capacity=self.rng.choice([None, None, None, 20, 50, 100, 500]),
+                ))
+            created += Event.objects.bulk_create(batch)
+            self.stdout.write(f"  events: {len(created)}/{n}")
+        return created
+
+    def create_rsvps(self, n, events, users):
+        if not events:
+            return 0
+        # popularity follows the event's rank in a shuffled order, so popular events
+        # are spread over all dates and categories
+        ranked = events[:]
+        self.rng.shuffle(ranked)
+        weights = zipf_weights(len(ranked), s=0.9)
+        scale = n / sum(weights)
+        total, batch = 0, []
+        for event, weight in zip(ranked, weights):
+            size = min(len(users), int(weight * scale + self.rng.random()))
+            if not size:
+                continue
+            attendees = self.rng.sample(users, size)
+            for i, user in enumerate(attendees):
+                waitlisted = event.capacity is not None and i >= event.capacity
+                batch.append(RSVP(user=user, event=event, status=RSVP.WAITLISTED if waitlisted else RSVP.CONFIRMED))
+            if len(batch) >= self.batch_size:
+                total += self.flush(batch)
+                batch = []
+        if batch:
+            total += self.flush(batch)
+        return total
+
+    def flush(self, batch):
+        # ignore_conflicts makes RSVPQuerySet.bulk_create recount the events in the
+        # batch with one UPDATE instead of one per event (and skips reruns' duplicates)
+        with transaction.atomic():
+            RSVP.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f"  rsvps: +{len(batch)}")
+        return len(batch)
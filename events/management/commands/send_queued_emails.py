@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.mail import deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Sends the emails waiting in the outbox, in batches over one reused mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and poll the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep between polls when --loop is set')
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                picked = deliver_pending(options['batch_size'])
+                total += picked
+                if picked < options['batch_size']:
+                    break
+            if total:
+                self.stdout.write(f"Processed {total} queued email(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
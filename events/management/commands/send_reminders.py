@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.reminders import BATCH_SIZE, send_reminders
+
+
+class Command(BaseCommand):
+    help = "Emails attendees 24 hours and 1 hour before their events. Run it every minute, or with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and check for due reminders instead of exiting')
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help='Seconds to sleep between checks when --loop is set')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_reminders(batch_size=options['batch_size'])
+            if sent:
+                self.stdout.write(f"Sent {sent} reminder(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
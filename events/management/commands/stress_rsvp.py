@@ -0,0 +1,87 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from events.booking import book_seat
+from events.models import Category, Event, RSVP
+
+User = get_user_model()
+
+
+def run_burst(event, users, threads):
+    """
+    Lets every user RSVP to the event at the same moment from a pool of threads.
+    Returns (elapsed_seconds, retries). SQLite answers contention with
+    "database is locked" instead of waiting, those attempts are retried.
+    """
+    retries = 0
+
+    def attempt(user):
+        nonlocal retries
+        deadline = time.monotonic() + 60
+        try:
+            while True:
+                try:
+                    return book_seat(event, user)
+                except OperationalError:
+                    if time.monotonic() > deadline:
+                        raise
+                    retries += 1
+                    time.sleep(random.uniform(0.001, 0.01))
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(attempt, users))
+    return time.perf_counter() - start, retries
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires a burst of concurrent RSVPs at a capacity-limited event and checks "
+        "that it was not oversold. The test event and users are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=300)
+        parser.add_argument('--capacity', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=32)
+
+    def handle(self, *args, **options):
+        organizer = User.objects.create(username='stress-organizer', is_active=True)
+        category, _ = Category.objects.get_or_create(name='stress-test')
+        event = Event.objects.create(
+            name='Ticket drop', description='stress test', location='-',
+            date=timezone.localdate() + timedelta(days=7), time=timezone.localtime().time(),
+            category=category, organizer=organizer, capacity=options['capacity'],
+        )
+        User.objects.bulk_create(
+            [User(username=f'stress-user-{i}', is_active=True) for i in range(options['users'])]
+        )
+        users = list(User.objects.filter(username__startswith='stress-user-'))
+        try:
+            elapsed, retries = run_burst(event, users, options['threads'])
+            event.refresh_from_db()
+            confirmed = RSVP.objects.filter(event=event, status=RSVP.CONFIRMED).count()
+            waitlisted = RSVP.objects.filter(event=event, status=RSVP.WAITLISTED).count()
+            self.stdout.write(
+                f"{len(users)} RSVPs in {elapsed:.2f}s ({len(users) / elapsed:.0f}/s, {retries} retries): "
+                f"{confirmed} confirmed, {waitlisted} waitlisted, counter {event.participant_count}, "
+                f"capacity {event.capacity}"
+            )
+            if confirmed > event.capacity or confirmed != event.participant_count:
+                self.stderr.write(self.style.ERROR("Event was oversold!"))
+            else:
+                self.stdout.write(self.style.SUCCESS("No overbooking."))
+        finally:
+            event.delete()
+            User.objects.filter(username__startswith='stress-').delete()
+            if not category.events.exists():
+                category.delete()
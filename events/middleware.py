@@ -0,0 +1,250 @@
+import json
+import logging
+import random
+import time
+import zoneinfo
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils import timezone
+
+from .routers import RoutingState, request_state
+
+logger = logging.getLogger('events.profiling')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+# Profile of the request being handled in this thread / task, None when not sampled
+_current = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Per-request numbers, filled by the DB wrapper and the template hook below."""
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = ''
+        self.template_ms = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook; sql only, params may hold personal data
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.queries += 1
+            self.db_ms += ms
+            if ms > self.slowest_ms:
+                self.slowest_ms, self.slowest_sql = ms, sql
+
+
+_render = DjangoTemplate.render
+
+def _timed_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _render(self, context, request)
+    # only the outermost render counts, templates rendered inside it are part of it
+    profile.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _render(self, context, request)
+    finally:
+        profile.template_depth -= 1
+        if not profile.template_depth:
+            profile.template_ms += (time.perf_counter() - start) * 1000
+
+DjangoTemplate.render = _timed_render
+
+
+def _profiled_execute(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def _install_db_hook():
+    # Stays on this thread's connections for good, and does nothing for requests
+    # that aren't sampled. Must run in the thread that runs the queries.
+    for conn in connections.all():
+        if _profiled_execute not in conn.execute_wrappers:
+            conn.execute_wrappers.append(_profiled_execute)
+
+
+class RequestProfilingMiddleware:
+    """
+    Cheap enough to leave on in production. Every request is timed; a sample of
+    PROFILING_SAMPLE_RATE of them also records queries, DB time, template time and
+    the slowest statement, returned in a Server-Timing header and logged as JSON.
+    Requests slower than PROFILING_SLOW_REQUEST_MS are always logged as warnings.
+    Goes first in MIDDLEWARE so the session and auth queries are included.
+    Works under WSGI and ASGI; under ASGI the sampled numbers follow the request
+    into the worker threads the ORM and the templates run in.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = self.sample()
+        if profile is not None:
+            _install_db_hook()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, (time.perf_counter() - start) * 1000)
+
+    async def __acall__(self, request):
+        profile = self.sample()
+        if profile is not None:
+            # the ORM runs in this request's thread-sensitive worker thread
+            await sync_to_async(_install_db_hook)()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, (time.perf_counter() - start) * 1000)
+
+    def sample(self):
+        sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        return RequestProfile() if sample_rate and random.random() < sample_rate else None
+
+    def finish(self, request, response, profile, total_ms):
+        slow_ms = getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 1000)
+        if profile is not None:
+            response['Server-Timing'] = self.server_timing(profile, total_ms)
+        slow = slow_ms is not None and total_ms >= slow_ms
+        if profile is not None or slow:
+            self.log(request, response, profile, total_ms, slow)
+        return response
+
+    def server_timing(self, profile, total_ms):
+        return (
+            f'db;dur={profile.db_ms:.1f};desc="{profile.queries} queries", '
+            f'tpl;dur={profile.template_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+
+    def log(self, request, response, profile, total_ms, slow):
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'slow': slow,
+            'sampled': profile is not None,
+        }
+        if profile is not None:
+            record.update(
+                queries=profile.queries,
+                db_ms=round(profile.db_ms, 1),
+                template_ms=round(profile.template_ms, 1),
+                slowest_sql_ms=round(profile.slowest_ms, 1),
+                slowest_sql=profile.slowest_sql[:1000],
+            )
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record))
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read-your-writes for PrimaryReplicaRouter. Unsafe requests (POST etc.) read
+    from the primary; a request that wrote anything sets a short-lived cookie,
+    and requests carrying it read from the primary too, until the replicas have
+    had REPLICA_PIN_SECONDS to catch up. Goes before the session and auth
+    middleware, so their reads are routed as well.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.state(request)
+        token = request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state = self.state(request)
+        token = request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_state.reset(token)
+        return self.finish(response, state)
+
+    def state(self, request):
+        cookie = getattr(settings, 'REPLICA_PIN_COOKIE', 'primary_pin')
+        return RoutingState(pinned=request.method not in SAFE_METHODS or cookie in request.COOKIES)
+
+    def finish(self, response, state):
+        if state.wrote:
+            response.set_cookie(
+                getattr(settings, 'REPLICA_PIN_COOKIE', 'primary_pin'), '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10), httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class TimezoneMiddleware:
+    """
+    Activates the browser's time zone, which base.html stores in a cookie, so
+    "today" on the dashboards, the list's date filters, the times shown and the
+    times organizers enter are the user's own. Without the cookie (first visit,
+    no JavaScript) it's TIME_ZONE.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.activate(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.activate(request)
+        return await self.get_response(request)
+
+    def activate(self, request):
+        name = request.COOKIES.get(getattr(settings, 'TIME_ZONE_COOKIE', 'tz'))
+        try:
+            tz = zoneinfo.ZoneInfo(name) if name else None
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            tz = None
+        if tz is None:
+            timezone.deactivate()
+        else:
+            timezone.activate(tz)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_capacity_rsvp_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['created_at'], name='rsvp_created_at_idx'),
+        ),
+    ]
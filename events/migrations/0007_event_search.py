@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:52
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from events.search import install_search
+    install_search(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from events.search import uninstall_search
+    uninstall_search(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_rsvp_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install, uninstall),
+    ]
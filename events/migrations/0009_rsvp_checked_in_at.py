@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_modification_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rsvp',
+            name='checked_in_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
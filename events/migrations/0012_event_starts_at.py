@@ -0,0 +1,56 @@
+import datetime
+import zoneinfo
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def fill_starts_at(apps, schema_editor):
+    # event dates and times are wall clock times in TIME_ZONE
+    Event = apps.get_model('events', 'Event')
+    tz = zoneinfo.ZoneInfo(settings.TIME_ZONE)
+    events = Event.objects.using(schema_editor.connection.alias).filter(starts_at__isnull=True)
+    batch = []
+    for event in events.only('id', 'date', 'time').iterator(chunk_size=BATCH_SIZE):
+        event.starts_at = datetime.datetime.combine(event.date, event.time, tzinfo=tz)
+        batch.append(event)
+        if len(batch) == BATCH_SIZE:
+            Event.objects.using(schema_editor.connection.alias).bulk_update(batch, ['starts_at'])
+            batch = []
+    Event.objects.using(schema_editor.connection.alias).bulk_update(batch, ['starts_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_reminder_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='starts_at',
+            field=models.DateTimeField(null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, help_text='Optional', null=True),
+        ),
+        migrations.RunPython(fill_starts_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='event',
+            name='starts_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['starts_at'], name='event_starts_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['category', 'starts_at'], name='event_category_starts_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:22
+
+import events.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_event_starts_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='time_zone',
+            field=models.CharField(default=events.models.default_time_zone, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='eventseries',
+            name='time_zone',
+            field=models.CharField(default=events.models.default_time_zone, editable=False, max_length=64),
+        ),
+    ]
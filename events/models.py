@@ -1,4 +1,20 @@
+import datetime
+import zoneinfo
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Coalesce
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .images import EVENT_IMAGE_WIDTHS, PROFILE_PICTURE_WIDTHS, has_variants, srcset, variant_url
+from .recurrence import parse_rule
 from django.contrib.auth.models import AbstractUser
 
 def default_event_image_path():
@@ -7,6 +23,19 @@ def default_event_image_path():
 def default_profile_image_path():
     return 'users/defaults/profile_default.png'
 
+def default_time_zone():
+    return settings.TIME_ZONE
+
+def event_start(day, time, time_zone=None):
+    """Event.starts_at for a date and time, wall clock times in time_zone (default TIME_ZONE)."""
+    tz = zoneinfo.ZoneInfo(time_zone or settings.TIME_ZONE)
+    return timezone.make_aware(datetime.datetime.combine(day, time), tz)
+
+def day_bounds(day):
+    """[start, end) of day in the active time zone (the user's, see TimezoneMiddleware)."""
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+
 class CustomUser(AbstractUser):
     profile_picture = models.ImageField(upload_to='users/images/', default=default_profile_image_path, blank=True)
     phone_number = models.CharField(max_length=15, blank=True)
@@ -14,35 +43,381 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+    @cached_property
+    def avatar_has_variants(self):
+        # pictures uploaded before generate_thumbnails ran only have the original
+        return bool(self.profile_picture) and has_variants(
+            self.profile_picture.name, PROFILE_PICTURE_WIDTHS, self.profile_picture.storage
+        )
+
+    @property
+    def avatar_url(self):
+        if not self.avatar_has_variants:
+            return self.profile_picture.url if self.profile_picture else ''
+        # 64px variant, enough for the 32px navbar avatar on retina screens
+        return variant_url(self.profile_picture, PROFILE_PICTURE_WIDTHS[0])
+
+    @property
+    def avatar_srcset(self):
+        return srcset(self.profile_picture, PROFILE_PICTURE_WIDTHS, 'jpg') if self.avatar_has_variants else ''
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+class EventSeries(models.Model):
+    """
+    A recurring event: what its occurrences have in common plus a recurrence
+    rule (see recurrence.py). An occurrence only becomes an Event row once it
+    needs one, when someone RSVPs or the organizer edits it; the others are
+    computed for the dates a page shows (see occurrences.py). Stored occurrences
+    are copies and keep their own changes when the series is edited later.
+    """
+    name = models.CharField(max_length=200)
+    description = models.TextField()
+    starts_on = models.DateField(help_text='Date of the first occurrence')
+    time = models.TimeField()
+    # the zone the dates and time are in, the organizer's (see EventSeriesForm)
+    time_zone = models.CharField(max_length=64, default=default_time_zone, editable=False)
+    location = models.CharField(max_length=200)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='series')
+    organizer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='organized_series')
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text='Leave empty for unlimited seats')
+    rule = models.CharField(max_length=200, help_text='e.g. FREQ=WEEKLY;BYDAY=MO,WE or FREQ=MONTHLY;COUNT=6')
+    # dates the rule produces that don't take place (EXDATE), as ISO strings
+    skipped_dates = models.JSONField(default=list, blank=True)
+    # last occurrence from the rule, None if open-ended; lets queries skip finished series
+    ends_on = models.DateField(null=True, editable=False)
+    # like Event.version, the occurrences that aren't stored are cached under it
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'event series'
+        indexes = [
+            models.Index(fields=['starts_on', 'ends_on'], name='series_window_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        series = super().from_db(db, field_names, values)
+        # the category before any edit, see signals.on_series_changed_touch_category
+        series._loaded_category_id = series.__dict__.get('category_id')
+        return series
+
+    def clean(self):
+        super().clean()
+        try:
+            parse_rule(self.rule)
+        except ValueError as e:
+            raise ValidationError({'rule': str(e)})
+
+    def save(self, *args, **kwargs):
+        self.ends_on = parse_rule(self.rule).last_date(self.starts_on)
+        if not self._state.adding:
+            self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        if isinstance(self.version, Combinable):
+            del self.version
+
+    def dates(self, start=None, end=None):
+        skipped = [datetime.date.fromisoformat(day) for day in self.skipped_dates]
+        return parse_rule(self.rule).dates(self.starts_on, start, end, skipped)
+
+    def has_date(self, day):
+        return next(iter(self.dates(day, day)), None) == day
+
+    def occurrence(self, day):
+        """The occurrence on day as an unsaved Event (pk None)."""
+        return Event(
+            series=self, occurrence_date=day, date=day, time=self.time, time_zone=self.time_zone,
+            starts_at=event_start(day, self.time, self.time_zone),
+            name=self.name, description=self.description, location=self.location,
+            category=self.category, organizer_id=self.organizer_id, capacity=self.capacity,
+            version=self.version, updated_at=self.updated_at,
+        )
+
+    def materialize(self, day):
+        """The stored Event of the occurrence on day, created if needed. Returns (event, created)."""
+        occurrence = self.occurrence(day)
+        fields = (
+            'name', 'description', 'date', 'time', 'time_zone', 'location', 'category_id', 'organizer_id', 'capacity',
+        )
+        # the unique (series, occurrence_date) constraint settles concurrent first RSVPs
+        return Event.objects.get_or_create(
+            series=self, occurrence_date=day,
+            defaults={field: getattr(occurrence, field) for field in fields},
+        )
+
+class EventQuerySet(models.QuerySet):
+    """
+    Reusable building blocks for the event pages, so every view loads
+    related rows the same way instead of lazily per row in the template.
+    """
+    def with_cards(self):
+        # everything an event card shows: category name, date, location, image
+        return self.select_related('category')
+
+    def rsvped_by(self, user):
+        return self.filter(pk__in=RSVP.objects.filter(user=user).values('event_id'))
+
+    def search(self, text, ranked=True):
+        from .search import search_events
+        return search_events(self, text, ranked=ranked)
+
+    def starting_between(self, start, end):
+        # a range scan of the starts_at index, or (category, starts_at) with a category filter
+        return self.filter(starts_at__gte=start, starts_at__lt=end)
+
+    def starting_on(self, day):
+        """Events of day in the user's time zone."""
+        return self.starting_between(*day_bounds(day))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), which keeps starts_at in sync
+        for obj in objs:
+            obj.starts_at = event_start(obj.date, obj.time, obj.time_zone)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def with_free_seat(self):
+        return self.filter(Q(capacity__isnull=True) | Q(participant_count__lt=F('capacity')))
+
+    def claim_seat(self, event_id):
+        """
+        Takes one seat with a single conditional UPDATE
+        (... SET participant_count = participant_count + 1 WHERE participant_count < capacity).
+        The row lock the UPDATE takes makes concurrent claims queue up, so an
+        event can never be oversold. Returns True if a seat was taken.
+        """
+        return self.filter(pk=event_id).with_free_seat().touch(
+            participant_count=F('participant_count') + 1
+        ) == 1
+
+    def recount_participants(self):
+        """Rewrites participant_count from the RSVP table. Returns the number of rows updated."""
+        actual = (
+            RSVP.objects.filter(event=OuterRef('pk'), status=RSVP.CONFIRMED).order_by()
+            .values('event').annotate(n=Count('id')).values('n')
+        )
+        return self.touch(participant_count=Coalesce(Subquery(actual), 0))
+
+    def touch(self, **changes):
+        """
+        UPDATE that also bumps version and updated_at, for changes that show up on
+        the event pages (RSVPs, seat counts, category renames). Cached pages and
+        ETags are keyed on the version, so they go stale with it.
+        """
+        return self.update(version=F('version') + 1, updated_at=timezone.now(), **changes)
+
 class Event(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField()
     date = models.DateField()
     time = models.TimeField()
+    # the zone date and time are wall clock times in: the organizer's when they
+    # entered them (see EventForm), TIME_ZONE for imports and older rows
+    time_zone = models.CharField(max_length=64, default=default_time_zone, editable=False)
+    # date and time as one point in time, set by save() and bulk_create(); what the
+    # time window queries use (dashboards, list filters, reminders)
+    starts_at = models.DateTimeField(editable=False)
+    ends_at = models.DateTimeField(null=True, blank=True, help_text='Optional')
     location = models.CharField(max_length=200)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='events')
     image = models.ImageField(upload_to='events/images/', default=default_event_image_path, blank=True)
     organizer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='organized_events')
     attendees = models.ManyToManyField(CustomUser, through='RSVP', related_name='rsvp_events', blank=True)
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text='Leave empty for unlimited seats')
+    # Denormalized count of confirmed RSVPs, kept in sync by the RSVP signals / RSVPQuerySet.bulk_create
+    participant_count = models.PositiveIntegerField(default=0, editable=False)
+    # Set on the stored occurrences of a recurring event; occurrence_date is the
+    # date the rule gave it, date may have been moved since
+    series = models.ForeignKey(EventSeries, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='occurrences')
+    occurrence_date = models.DateField(null=True, blank=True, editable=False)
+    # PostgreSQL only, filled by a trigger (see search.py); SQLite uses an FTS5 table instead
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Bumped by every save and by EventQuerySet.touch(); keys the page caches (see caching.py)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Never written from the instance on save: participant_count is only changed with
+    # SET participant_count = participant_count + n, search_vector by a trigger
+    MAINTAINED_FIELDS = ('participant_count', 'search_vector')
+
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the event list: ORDER BY date DESC, id DESC
+            models.Index(fields=['date', 'id'], name='event_date_id_idx'),
+            models.Index(fields=['category', 'date', 'id'], name='event_category_date_idx'),
+            models.Index(fields=['name', 'location'], name='event_name_location_idx'),
+            # Last-Modified of the event list
+            models.Index(fields=['updated_at'], name='event_updated_at_idx'),
+            # time windows: today's events, the list's from / to, reminders
+            models.Index(fields=['starts_at'], name='event_starts_at_idx'),
+            models.Index(fields=['category', 'starts_at'], name='event_category_starts_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'occurrence_date'], name='event_series_occurrence_uniq'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.starts_at = event_start(self.date, self.time, self.time_zone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'time', 'time_zone'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'starts_at'}
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # A full save from a form would otherwise write back a participant_count
+            # read before concurrent RSVPs changed it
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.MAINTAINED_FIELDS
+            ]
+            self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        if isinstance(self.version, Combinable):
+            # deferred, so it's reloaded from the database when next read
+            del self.version
+
+    def get_absolute_url(self):
+        if self.pk is None:
+            # an occurrence of a series that isn't stored yet
+            return reverse('occurrence_detail', args=[self.series_id, self.occurrence_date.isoformat()])
+        return reverse('event_detail', args=[self.pk])
+
+    @cached_property
+    def image_has_variants(self):
+        # images uploaded before generate_thumbnails ran only have the original
+        return bool(self.image) and has_variants(self.image.name, EVENT_IMAGE_WIDTHS, self.image.storage)
+
+    @property
+    def image_card_url(self):
+        if not self.image_has_variants:
+            return self.image.url if self.image else ''
+        return variant_url(self.image, EVENT_IMAGE_WIDTHS[0])
+
+    @property
+    def image_srcset(self):
+        return srcset(self.image, EVENT_IMAGE_WIDTHS, 'jpg') if self.image_has_variants else ''
+
+    @property
+    def image_webp_srcset(self):
+        return srcset(self.image, EVENT_IMAGE_WIDTHS, 'webp') if self.image_has_variants else ''
+
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.participant_count, 0)
+
+class RSVPQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips post_save, so bump the event counters here
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            # can't tell which rows were really inserted
+            event_ids = {obj.event_id for obj in objs}
+            Event.objects.filter(pk__in=event_ids).recount_participants()
+        else:
+            added = {}
+            for obj in objs:
+                if obj.status == RSVP.CONFIRMED:
+                    added[obj.event_id] = added.get(obj.event_id, 0) + 1
+            for event_id, n in added.items():
+                Event.objects.filter(pk=event_id).touch(participant_count=F('participant_count') + n)
+        return objs
+
 class RSVP(models.Model):
+    CONFIRMED = 'confirmed'
+    WAITLISTED = 'waitlisted'
+    STATUS_CHOICES = [(CONFIRMED, 'Confirmed'), (WAITLISTED, 'Waitlisted')]
+
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='rsvps')
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rsvps')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=CONFIRMED)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # set at the door, see attendees.check_in()
+    checked_in_at = models.DateTimeField(null=True, blank=True)
+
+    objects = RSVPQuerySet.as_manager()
 
     class Meta:
         unique_together = ('user', 'event')
         ordering = ['-created_at']
+        indexes = [
+            # next in line on the waitlist
+            models.Index(fields=['event', 'status', 'created_at'], name='rsvp_waitlist_idx'),
+            # RSVPs per day on the dashboards
+            models.Index(fields=['created_at'], name='rsvp_created_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} → {self.event.name}"
+
+class OutboundEmail(models.Model):
+    """
+    Outbox row for an email that still has to go out. Requests only insert these;
+    the send_queued_emails worker delivers them (see events/mail.py).
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.recipients)}"
+
+    def as_message(self, connection=None):
+        return EmailMessage(
+            self.subject, self.body, self.from_email or None, self.recipients, connection=connection
+        )
+
+class ReminderLog(models.Model):
+    """
+    A reminder that went out (see reminders.py). The unique constraint is what
+    keeps a restarted, or a second, dispatcher from sending it again.
+    """
+    DAY_BEFORE = '24h'
+    HOUR_BEFORE = '1h'
+    KIND_CHOICES = [(DAY_BEFORE, '24 hours before'), (HOUR_BEFORE, '1 hour before')]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='reminders')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='reminders')
+    kind = models.CharField(max_length=3, choices=KIND_CHOICES)
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user', 'kind'], name='reminder_once_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.event_id} → {self.user_id}"
@@ -0,0 +1,173 @@
+"""
+Occurrences of recurring events (EventSeries) in the event pages.
+
+Only occurrences that someone RSVP'd to or that were edited are stored, as
+Event rows with series / occurrence_date set. The rest are "virtual": unsaved
+Event instances (pk None) computed from the rules for the window a page shows
+and merged into the stored rows. A stored row always wins over the virtual
+occurrence of the same date.
+"""
+import datetime
+import heapq
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Event, EventSeries
+from .pagination import KeysetPage, beyond, pack_cursor, unpack_cursor
+
+
+def horizon():
+    """The last date virtual occurrences are shown for, open-ended series would never stop."""
+    days = getattr(settings, 'RECURRENCE_HORIZON_DAYS', 365)
+    return timezone.localdate() + datetime.timedelta(days=days)
+
+
+def series_between(start, end, category=None, text=None):
+    """Series that may have dates in [start, end]; start None means any time before end."""
+    series = EventSeries.objects.select_related('category').filter(starts_on__lte=end)
+    if start is not None:
+        series = series.filter(Q(ends_on__isnull=True) | Q(ends_on__gte=start))
+    if category:
+        series = series.filter(category_id=category)
+    if text:
+        # few rows, LIKE is fine here; the events use the full-text index
+        series = series.filter(
+            Q(name__icontains=text) | Q(location__icontains=text) | Q(description__icontains=text)
+        )
+    return series
+
+
+def stored_dates(series, start, end):
+    """(series id, occurrence date) of the stored occurrences in [start, end]."""
+    stored = Event.objects.filter(series__in=[s.pk for s in series], occurrence_date__lte=end)
+    if start is not None:
+        stored = stored.filter(occurrence_date__gte=start)
+    return set(stored.values_list('series_id', 'occurrence_date'))
+
+
+def virtual_occurrences(series, start, end, stored=None):
+    """
+    The occurrences of series in [start, end] that have no Event row, sorted by
+    date and time. stored is the stored_dates() of the window if the caller
+    already has them.
+    """
+    series = list(series)
+    if not series:
+        return []
+    if stored is None:
+        stored = stored_dates(series, start, end)
+    occurrences = [
+        s.occurrence(day) for s in series for day in s.dates(start, end) if (s.pk, day) not in stored
+    ]
+    occurrences.sort(key=lambda e: (e.date, e.time, e.series_id))
+    return occurrences
+
+
+def virtual_starting_between(start, end):
+    """The virtual occurrences that start in [start, end), aware datetimes."""
+    # the rules give dates in each series' own zone, a day either side of the
+    # window's dates covers every zone's
+    first = timezone.localdate(start) - datetime.timedelta(days=1)
+    last = timezone.localdate(end) + datetime.timedelta(days=1)
+    occurrences = virtual_occurrences(series_between(first, last), first, last)
+    return sorted((e for e in occurrences if start <= e.starts_at < end), key=lambda e: e.starts_at)
+
+
+def merge(stored, virtual, key, reverse=False):
+    """Both lists sorted by key (reversed if reverse) in, one sorted list out."""
+    return list(heapq.merge(stored, virtual, key=key, reverse=reverse))
+
+
+# ------------------------ EVENT LIST ------------------------
+
+# The list is newest first. Its order, and the cursors of its pages, run over
+# (date, kind, n): a stored event is (date, 0, id), a virtual occurrence is
+# (date, 1, series id), so on a date the virtual occurrences come first.
+
+def _list_key(event):
+    if event.pk is None:
+        return (event.date, 1, event.series_id)
+    return (event.date, 0, event.pk)
+
+
+def _encode(key):
+    day, virtual, n = key
+    return pack_cursor([day, f's{n}' if virtual else n])
+
+
+def _decode(cursor):
+    """The list key of a cursor, None if it isn't one; stored rows' cursors are date|id."""
+    try:
+        day, n = unpack_cursor(cursor)
+        virtual = n.startswith('s')
+        return (datetime.date.fromisoformat(day), int(virtual), int(n.removeprefix('s')))
+    except ValueError:
+        return None
+
+
+def _stored_beyond(queryset, key, older):
+    # the stored rows after key in the list's order (older) or before it
+    day, virtual, n = key
+    if virtual:
+        # every stored row of the date sorts below the virtual ones
+        return queryset.filter(date__lte=day) if older else queryset.filter(date__gt=day)
+    return queryset.filter(beyond(['date', 'id'], [day, n], 'lt' if older else 'gt'))
+
+
+def _virtual_keys(filters, start, end, key, older):
+    """(list key, series) of the virtual occurrences in [start, end] beyond key."""
+    start = max(filter(None, (start, filters.get('from'))), default=None)
+    end = min(filter(None, (end, filters.get('to'), horizon())))
+    if start is not None and start > end:
+        return []
+    series = list(series_between(start, end, filters.get('category'), (filters.get('q') or '').strip()))
+    if not series:
+        return []
+    stored = stored_dates(series, start, end)
+    keys = [
+        ((day, 1, s.pk), s) for s in series for day in s.dates(start, end) if (s.pk, day) not in stored
+    ]
+    if key is not None:
+        keys = [(k, s) for k, s in keys if (k < key if older else k > key)]
+    return keys
+
+
+def paginate_event_list(queryset, filters, page_size, after=None, before=None):
+    """
+    A KeysetPage of the event list: the stored events of queryset (already
+    filtered) and the virtual occurrences, merged in one order and cut at
+    page_size, so a page never grows with the number of recurring events. The
+    cursors can point at either kind of row.
+
+    page_size + 1 stored rows come from the index as in keyset_paginate(); the
+    rules are only expanded over the dates those rows span, the whole rest of
+    the list if fewer came back.
+    """
+    key = _decode(before) if before else None
+    older = key is None
+    if older and after:
+        key = _decode(after)
+    if key is not None:
+        queryset = _stored_beyond(queryset, key, older)
+    order = ('-date', '-id') if older else ('date', 'id')
+    rows = list(queryset.order_by(*order)[:page_size + 1])
+    # the dates page_size + 1 merged rows can fall on
+    bound = rows[-1].date if len(rows) > page_size else None
+    near = key[0] if key is not None else None
+    if older:
+        virtual = _virtual_keys(filters, bound, near or datetime.date.max, key, older)
+    else:
+        virtual = _virtual_keys(filters, near, bound or datetime.date.max, key, older)
+    merged = [(_list_key(e), e) for e in rows] + virtual
+    merged.sort(key=lambda item: item[0], reverse=older)
+    more = len(merged) > page_size
+    merged = merged[:page_size]
+    page = [row if isinstance(row, Event) else row.occurrence(k[0]) for k, row in merged]
+    if not older:
+        page.reverse()
+    first, last = (_encode(_list_key(page[0])), _encode(_list_key(page[-1]))) if page else (None, None)
+    if older:
+        return KeysetPage(page, next_cursor=last if more else None, prev_cursor=first if key else None)
+    return KeysetPage(page, next_cursor=last, prev_cursor=first if more else None)
@@ -0,0 +1,142 @@
+"""
+The recurrence rules of EventSeries: a subset of iCalendar's RRULE (RFC 5545
+3.3.10) that covers what organizers set up, e.g.
+
+    FREQ=WEEKLY;BYDAY=MO,WE          every Monday and Wednesday
+    FREQ=WEEKLY;INTERVAL=2;COUNT=10  every other week, ten times
+    FREQ=MONTHLY;UNTIL=20271231      on the start date's day of the month
+
+Dates are computed for the window a page asks for. Rules without COUNT jump
+straight to the window instead of walking from the series' first date.
+"""
+import datetime
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+PARTS = ('FREQ', 'INTERVAL', 'BYDAY', 'COUNT', 'UNTIL')
+# COUNT rules are walked from the start, keep that walk short
+MAX_COUNT = 1000
+
+
+class Rule:
+    """A parsed rule. byday holds weekday numbers (Monday is 0), WEEKLY only."""
+    def __init__(self, freq, interval=1, byday=(), count=None, until=None):
+        self.freq = freq
+        self.interval = interval
+        self.byday = tuple(sorted(set(byday)))
+        self.count = count
+        self.until = until
+
+    def _period(self, starts_on, k):
+        # the dates of the k-th DAILY / WEEKLY / MONTHLY period, ascending
+        if self.freq == 'DAILY':
+            return [starts_on + datetime.timedelta(days=k * self.interval)]
+        if self.freq == 'WEEKLY':
+            monday = starts_on - datetime.timedelta(days=starts_on.weekday())
+            week = monday + datetime.timedelta(weeks=k * self.interval)
+            return [week + datetime.timedelta(days=day) for day in self.byday or (starts_on.weekday(),)]
+        month = starts_on.month - 1 + k * self.interval
+        try:
+            return [starts_on.replace(year=starts_on.year + month // 12, month=month % 12 + 1)]
+        except ValueError:
+            if starts_on.year + month // 12 > datetime.MAXYEAR:
+                raise OverflowError
+            return []  # no 31st this month, RFC 5545 skips it
+
+    def _first_period(self, starts_on, start):
+        # the last period that begins on or before start
+        if self.freq == 'DAILY':
+            periods = (start - starts_on).days
+        elif self.freq == 'WEEKLY':
+            # weeks run Monday to Sunday
+            periods = (start - starts_on).days + starts_on.weekday()
+            periods //= 7
+        else:
+            periods = (start.year - starts_on.year) * 12 + start.month - starts_on.month
+        return max(periods // self.interval, 0)
+
+    def dates(self, starts_on, start=None, end=None, skipped=()):
+        """
+        The series' dates in [start, end], ascending; start / end None leave that
+        side open. Dates in skipped (EXDATEs) still count towards COUNT.
+        """
+        limit = min(filter(None, (end, self.until)), default=None)
+        if limit is None and self.count is None:
+            raise ValueError("An open-ended rule needs an end date")
+        skipped = set(skipped)
+        k = 0 if self.count or start is None else self._first_period(starts_on, start)
+        n = 0
+        while True:
+            try:
+                period = self._period(starts_on, k)
+            except OverflowError:
+                return
+            for day in period:
+                if day < starts_on:
+                    continue
+                if limit is not None and day > limit:
+                    return
+                n += 1
+                if self.count is not None and n > self.count:
+                    return
+                if (start is None or day >= start) and day not in skipped:
+                    yield day
+            k += 1
+
+    def last_date(self, starts_on):
+        """The series' final date, None if it never ends."""
+        if self.count is None:
+            return self.until
+        last = None
+        for last in self.dates(starts_on):
+            pass
+        return last
+
+
+def _positive_int(name, value, maximum=None):
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} must be a positive whole number")
+    if maximum and int(value) > maximum:
+        raise ValueError(f"{name} can be at most {maximum}")
+    return int(value)
+
+
+def parse_rule(text):
+    """Rule from 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10'. Raises ValueError with a readable message."""
+    parts = {}
+    for item in text.strip().upper().removeprefix('RRULE:').split(';'):
+        if not item:
+            continue
+        name, sep, value = item.partition('=')
+        if not sep or not value:
+            raise ValueError(f"'{item}' is not NAME=VALUE")
+        if name not in PARTS:
+            raise ValueError(f"{name} is not supported, use {', '.join(PARTS)}")
+        if name in parts:
+            raise ValueError(f"{name} is given twice")
+        parts[name] = value
+
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    rule = Rule(freq)
+    if 'INTERVAL' in parts:
+        rule.interval = _positive_int('INTERVAL', parts['INTERVAL'])
+    if 'BYDAY' in parts:
+        if freq != 'WEEKLY':
+            raise ValueError("BYDAY only works with FREQ=WEEKLY")
+        days = parts['BYDAY'].split(',')
+        if not set(days) <= set(WEEKDAYS):
+            raise ValueError(f"BYDAY takes {','.join(WEEKDAYS)}")
+        rule.byday = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+    if 'COUNT' in parts and 'UNTIL' in parts:
+        raise ValueError("Give COUNT or UNTIL, not both")
+    if 'COUNT' in parts:
+        rule.count = _positive_int('COUNT', parts['COUNT'], MAX_COUNT)
+    if 'UNTIL' in parts:
+        try:
+            # a date, or a date-time of which only the date matters here
+            rule.until = datetime.datetime.strptime(parts['UNTIL'][:8], '%Y%m%d').date()
+        except ValueError:
+            raise ValueError("UNTIL must be a date like 20271231")
+    return rule
@@ -0,0 +1,148 @@
+"""
+Reminder emails 24 hours and 1 hour before an event, sent by the send_reminders
+command (every minute from cron, or with --loop).
+
+A tick reads the events starting within the next 24 hours with one range query
+on starts_at, streams their confirmed attendees with .iterator() and sends
+in batches over one mail connection. Every reminder is claimed with a
+ReminderLog row, committed before the mail goes out: a dispatcher that restarts
+or runs twice skips what is claimed, and a failed send gives its claim back so
+the next tick tries again.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Event, ReminderLog, RSVP
+
+logger = logging.getLogger(__name__)
+
+# (kind, how long before the start), soonest first: an event that is already
+# less than an hour away only gets the 1 hour reminder
+REMINDERS = (
+    (ReminderLog.HOUR_BEFORE, datetime.timedelta(hours=1)),
+    (ReminderLog.DAY_BEFORE, datetime.timedelta(hours=24)),
+)
+BATCH_SIZE = 100
+SUBJECTS = {
+    ReminderLog.HOUR_BEFORE: "Starting in an hour: {name}",
+    # the 24 hour window can end later the same day, so no "tomorrow"
+    ReminderLog.DAY_BEFORE: "Coming up: {name}",
+}
+
+
+def due_events(now):
+    """{kind: {event id: event}} of the reminders due at now, from one range query on starts_at."""
+    events = (
+        Event.objects.starting_between(now, now + REMINDERS[-1][1])
+        .only('id', 'name', 'date', 'time', 'time_zone', 'starts_at', 'location')
+    )
+    due = {kind: {} for kind, _ in REMINDERS}
+    for event in events:
+        for kind, lead in REMINDERS:
+            if event.starts_at <= now + lead:
+                due[kind][event.pk] = event
+                break
+    return due
+
+
+def _recipients(kind, event_ids, chunk_size):
+    sent = ReminderLog.objects.filter(event_id=OuterRef('event_id'), user_id=OuterRef('user_id'), kind=kind)
+    return (
+        RSVP.objects.filter(event_id__in=event_ids, status=RSVP.CONFIRMED)
+        .exclude(Exists(sent))
+        .exclude(user__email='')
+        .order_by('event_id', 'id')
+        .values_list('event_id', 'user_id', 'user__email', 'user__first_name', 'user__username')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _claim(kind, batch):
+    """The rows of batch whose reminder this dispatcher got to send."""
+    try:
+        with transaction.atomic():
+            ReminderLog.objects.bulk_create([
+                ReminderLog(event_id=event_id, user_id=user_id, kind=kind) for event_id, user_id, *_ in batch
+            ])
+        return batch
+    except IntegrityError:
+        pass
+    # another dispatcher sent some of them meanwhile, claim one at a time
+    claimed = []
+    for row in batch:
+        try:
+            with transaction.atomic():
+                ReminderLog.objects.create(event_id=row[0], user_id=row[1], kind=kind)
+        except IntegrityError:
+            continue
+        claimed.append(row)
+    return claimed
+
+
+def _message(kind, event, row, connection):
+    _, _, email, first_name, username = row
+    body = (
+        f"Hi {first_name or username},\n\n"
+        f"A reminder that '{event.name}' is on {event.date} at {event.time} ({event.time_zone}).\n"
+        f"Location: {event.location}\n\nSee you there!"
+    )
+    return EmailMessage(
+        SUBJECTS[kind].format(name=event.name), body, settings.DEFAULT_FROM_EMAIL or None, [email],
+        connection=connection,
+    )
+
+
+def _send_batch(connection, kind, events, batch):
+    claimed, failed = _claim(kind, batch), []
+    # one message per send_messages() call, over the batch's open connection:
+    # a backend that fails part way through a list doesn't say which messages
+    # went out, and only the failed ones may give their claim back
+    for row in claimed:
+        try:
+            connection.send_messages([_message(kind, events[row[0]], row, connection)])
+        except Exception as exc:
+            logger.warning("Reminder for event %s to user %s failed: %s", row[0], row[1], exc)
+            failed.append(row)
+    if failed:
+        # give the claims back, the next tick retries these
+        retry = Q()
+        for event_id, user_id, *_ in failed:
+            retry |= Q(event_id=event_id, user_id=user_id)
+        ReminderLog.objects.filter(retry, kind=kind).delete()
+    return len(claimed) - len(failed)
+
+
+def send_reminders(now=None, batch_size=BATCH_SIZE):
+    """Sends the reminders due at now (default: now). Returns how many went out."""
+    due = due_events(now or timezone.now())
+    if not any(due.values()):
+        return 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # nothing was claimed yet, the next tick tries again
+        logger.warning("Can't open the mail connection for reminders: %s", exc)
+        return 0
+    sent = 0
+    try:
+        for kind, events in due.items():
+            if not events:
+                continue
+            batch = []
+            for row in _recipients(kind, list(events), batch_size):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    sent += _send_batch(connection, kind, events, batch)
+                    batch = []
+            if batch:
+                sent += _send_batch(connection, kind, events, batch)
+    finally:
+        connection.close()
+    return sent
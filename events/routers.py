@@ -0,0 +1,64 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# State of the request being handled, None outside requests (management commands,
+# the shell, the outbox worker), which always use the primary
+request_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    """Per request: whether reads must stay on the primary, whether it wrote, and its replica."""
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends the events app's reads in a request to one replica (picked at random
+    per request, so its queries see one consistent snapshot) and every write
+    to the primary (DEFAULT_DB_ALIAS). Reads stay on the primary when:
+
+    - the request is pinned (a POST, or a recent write by the same browser,
+      see ReplicaPinningMiddleware), so users see their own RSVPs and edits
+      even if the replicas lag behind;
+    - a transaction is open on the primary, so reads inside it see its writes;
+    - no replica is configured (DATABASE_REPLICAS in settings).
+    """
+    route_app_labels = {'events'}
+
+    def db_for_read(self, model, **hints):
+        state = request_state.get()
+        if state is None or state.pinned or model._meta.app_label not in self.route_app_labels:
+            return DEFAULT_DB_ALIAS
+        pool = replicas()
+        if not pool or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.replica not in pool:
+            state.replica = random.choice(pool)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        if state is not None:
+            # the rest of this request reads what it wrote, and so do the next few
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get the schema by replication
+        return False if db in replicas() else None
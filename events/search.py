@@ -0,0 +1,154 @@
+"""
+Full-text search over Event name, location and description.
+
+PostgreSQL: Event.search_vector (tsvector) kept up to date by a trigger, GIN indexed.
+SQLite: an FTS5 table (events_event_fts) over the same columns, kept up to date by triggers.
+Both are created by migration 0007; triggers also cover bulk_create/update().
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'events_event_fts'
+# bm25 weights for (name, location, description), same order as the A/B/C weights on PostgreSQL
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+PG_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.location, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.description, '')), 'C')"
+)
+
+PG_INSTALL = [
+    "CREATE INDEX IF NOT EXISTS event_search_vector_idx ON events_event USING gin (search_vector)",
+    f"""
+    CREATE OR REPLACE FUNCTION events_event_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {PG_SEARCH_VECTOR};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS events_event_search_vector ON events_event",
+    """
+    CREATE TRIGGER events_event_search_vector
+    BEFORE INSERT OR UPDATE OF name, location, description ON events_event
+    FOR EACH ROW EXECUTE FUNCTION events_event_search_vector_update()
+    """,
+    # fires the trigger for the existing rows
+    "UPDATE events_event SET name = name",
+]
+PG_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS events_event_search_vector ON events_event",
+    "DROP FUNCTION IF EXISTS events_event_search_vector_update()",
+    "DROP INDEX IF EXISTS event_search_vector_idx",
+]
+
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON events_event BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name, location, description)
+            VALUES (new.id, new.name, new.location, new.description);
+        END""",
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON events_event BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, location, description)
+            VALUES ('delete', old.id, old.name, old.location, old.description);
+        END""",
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, location, description ON events_event BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, location, description)
+            VALUES ('delete', old.id, old.name, old.location, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, name, location, description)
+            VALUES (new.id, new.name, new.location, new.description);
+        END""",
+}
+
+
+def install_search(connection):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for sql in PG_INSTALL:
+                cursor.execute(sql)
+    elif connection.vendor == 'sqlite':
+        install_sqlite_fts(connection)
+
+
+def uninstall_search(connection):
+    if connection.vendor == 'postgresql':
+        statements = PG_UNINSTALL
+    elif connection.vendor == 'sqlite':
+        statements = [f'DROP TRIGGER IF EXISTS {name}' for name in SQLITE_TRIGGERS]
+        statements.append(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def install_sqlite_fts(connection, only_repair=False):
+    """
+    Creates the FTS5 table and its triggers if they're missing. SQLite migrations
+    that rebuild events_event drop its triggers, so the post_migrate handler calls
+    this again with only_repair=True.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE tbl_name IN ('events_event', %s)", [FTS_TABLE])
+        existing = {row[0] for row in cursor.fetchall()}
+        if only_repair and FTS_TABLE not in existing:
+            return
+        if existing.issuperset(SQLITE_TRIGGERS) and FTS_TABLE in existing:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"name, location, description, content='events_event', content_rowid='id')"
+        )
+        for sql in SQLITE_TRIGGERS.values():
+            cursor.execute(sql)
+        # rows may have changed while the triggers were gone
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _fts5_query(text):
+    # every word must match, as a prefix; quoting keeps FTS5 operators in user input inert
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def search_events(queryset, text, ranked=True):
+    """
+    Filters the queryset to events matching `text`. With ranked=True the result
+    is annotated with `rank` and ordered best match first.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query)
+        if ranked:
+            queryset = queryset.annotate(rank=SearchRank(F('search_vector'), query)).order_by('-rank', '-pk')
+        return queryset
+
+    if vendor == 'sqlite':
+        match = _fts5_query(text)
+        if not match:
+            return queryset
+        if not ranked:
+            return queryset.filter(
+                pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+            )
+        # bm25() only works on the FTS table in the FROM clause; a correlated
+        # subquery per row would rerun the whole match for every event.
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        table = queryset.model._meta.db_table
+        return queryset.extra(
+            select={'rank': f"-bm25({FTS_TABLE}, {weights})"},
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = {table}.id", f"{FTS_TABLE} MATCH %s"],
+            params=[match],
+        ).order_by('-rank', '-pk')
+
+    return queryset.filter(Q(name__icontains=text) | Q(location__icontains=text))
@@ -1,38 +1,39 @@
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group
-from django.core.mail import send_mail
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from django.conf import settings
 
-from .models import RSVP, CustomUser
+from .models import RSVP, Category, CustomUser, Event, EventSeries
+from .mail import queue_email, queue_rsvp_confirmation
+from .booking import promote_waitlist
+from .stats import forget_dashboard_stats
+from .images import EVENT_IMAGE_WIDTHS, PROFILE_PICTURE_WIDTHS, ensure_variants
+from .helpers import forget_group_ids, forget_user_roles, group_id
 
 
-# Ensure Groups exist
-def ensure_groups():
-    for name in ['Admin', 'Organizer', 'Participant']:
-        Group.objects.get_or_create(name=name)
+@receiver(pre_save, sender=CustomUser)
+def on_user_created_inactive(sender, instance: CustomUser, **kwargs):
+    # নতুন ইউজার by default inactive, set before the INSERT instead of a second UPDATE
+    if instance._state.adding and not (instance.is_superuser or instance.is_staff):
+        instance.is_active = False
 
 
 @receiver(post_save, sender=CustomUser)
 def on_user_created_send_activation(sender, instance: CustomUser, created, **kwargs):
-    ensure_groups()
-
     if created:
         # Superuser/Staff এর জন্য ইমেইল পাঠানো লাগবে না
         if instance.is_superuser or instance.is_staff:
             return
 
-        # Default role: Participant
-        participant_group = Group.objects.get(name='Participant')
-        instance.groups.add(participant_group)
-
-        # নতুন ইউজার by default inactive
-        instance.is_active = False
-        instance.save(update_fields=['is_active'])
+        # Default role: Participant. One INSERT into the through table;
+        # groups.add() would first SELECT the user's existing groups.
+        CustomUser.groups.through.objects.create(customuser=instance, group_id=group_id('Participant'))
 
         # Activation mail পাঠানো
         uid = urlsafe_base64_encode(force_bytes(instance.pk))
@@ -48,30 +49,108 @@ def on_user_created_send_activation(sender, instance: CustomUser, created, **kwa
             f"Thanks."
         )
 
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [instance.email],
-            fail_silently=False,
-        )
+        queue_email(subject, message, [instance.email], settings.DEFAULT_FROM_EMAIL)
+
+
+# Only confirmed RSVPs take a seat. Waitlisted ones are promoted by booking.py,
+# which does its own counting. Either way the event's version moves on, the
+# participant list and waitlist size are part of the cached page.
+@receiver(post_save, sender=RSVP)
+def on_rsvp_created_count(sender, instance: RSVP, created, **kwargs):
+    if not created:
+        return
+    event = Event.objects.filter(pk=instance.event_id)
+    if instance.status == RSVP.CONFIRMED:
+        event.touch(participant_count=F('participant_count') + 1)
+    else:
+        event.touch()
+
+
+@receiver(post_delete, sender=RSVP)
+def on_rsvp_deleted_count(sender, instance: RSVP, **kwargs):
+    event = Event.objects.filter(pk=instance.event_id)
+    if instance.status != RSVP.CONFIRMED:
+        event.touch()
+        return
+    freed = event.filter(participant_count__gt=0).touch(
+        participant_count=F('participant_count') - 1
+    )
+    if freed:
+        promote_waitlist(instance.event_id)
+
+
+@receiver(post_save, sender=Category)
+def on_category_saved_touch_events(sender, instance: Category, created, **kwargs):
+    # the category name is shown on every event page
+    if not created:
+        Event.objects.filter(category=instance).touch()
+        EventSeries.objects.filter(category=instance).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+@receiver(post_save, sender=EventSeries)
+@receiver(post_delete, sender=EventSeries)
+def on_series_changed_touch_category(sender, instance: EventSeries, **kwargs):
+    # The event list's and category feeds' ETags follow the categories'
+    # updated_at; a series' occurrences show up in both, on its old and new category
+    categories = {instance.category_id, getattr(instance, '_loaded_category_id', None)} - {None}
+    Category.objects.filter(pk__in=categories).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Event)
+def on_event_saved_fill_seats(sender, instance: Event, created, **kwargs):
+    # capacity may have been raised
+    if not created:
+        promote_waitlist(instance.pk)
 
 
 @receiver(post_save, sender=RSVP)
 def on_rsvp_send_email(sender, instance: RSVP, created, **kwargs):
+    if created and instance.status == RSVP.CONFIRMED:
+        queue_rsvp_confirmation(instance)
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def on_user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # user.groups.add/remove/clear(...)
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.__dict__.pop('_role_names', None)
+            forget_user_roles([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        # group.user_set.add/remove(...)
+        forget_user_roles(pk_set)
+    elif action == 'pre_clear':
+        forget_user_roles(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def on_group_changed(sender, **kwargs):
+    forget_group_ids()
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+@receiver(post_delete, sender=CustomUser)
+def on_stats_changed(sender, **kwargs):
+    forget_dashboard_stats()
+
+
+@receiver(post_save, sender=CustomUser)
+def on_user_saved_stats(sender, created, **kwargs):
+    # logins save last_login, only new users change the numbers
     if created:
-        user = instance.user
-        event = instance.event
-        subject = f"RSVP Confirmed: {event.name}"
-        message = (
-            f"Hi {user.first_name or user.username},\n\n"
-            f"You have successfully RSVP’d to '{event.name}' on {event.date} at {event.time}.\n"
-            f"Location: {event.location}\n\nSee you there!"
-        )
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=True,
-        )
+        forget_dashboard_stats()
+
+
+# Resized copies of uploads, see images.py
+@receiver(post_save, sender=Event)
+def on_event_image_variants(sender, instance: Event, **kwargs):
+    ensure_variants(instance.image, EVENT_IMAGE_WIDTHS)
+
+
+@receiver(post_save, sender=CustomUser)
+def on_profile_picture_variants(sender, instance: CustomUser, **kwargs):
+    ensure_variants(instance.profile_picture, PROFILE_PICTURE_WIDTHS)
@@ -0,0 +1,69 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Category, Event, RSVP, day_bounds
+
+STATS_CACHE_KEY = 'dashboard-stats'
+STATS_GENERATION_KEY = 'dashboard-stats-generation'
+STATS_CACHE_TIMEOUT = 60
+RSVP_DAYS = 14
+
+
+def _compute(today):
+    # today in the user's time zone
+    start, end = day_bounds(today)
+    stats = Event.objects.aggregate(
+        total_events=Count('id'),
+        upcoming_events=Count('id', filter=Q(starts_at__gte=start)),
+        past_events=Count('id', filter=Q(starts_at__lt=start)),
+        todays_events=Count('id', filter=Q(starts_at__gte=start, starts_at__lt=end)),
+        total_rsvps=Coalesce(Sum('participant_count'), 0),
+    )
+    stats['total_users'] = get_user_model().objects.count()
+    # participant_count is denormalized, so this is a GROUP BY over events only
+    stats['categories'] = list(
+        Category.objects.annotate(
+            event_count=Count('events'),
+            rsvp_count=Coalesce(Sum('events__participant_count'), 0),
+        ).order_by('name')
+    )
+    # a bound on the column itself, so the created_at index is used
+    stats['rsvps_per_day'] = list(
+        RSVP.objects.filter(created_at__gte=day_bounds(today - timedelta(days=RSVP_DAYS - 1))[0])
+        .annotate(day=TruncDate('created_at'))
+        .values('day').annotate(rsvps=Count('id')).order_by('day')
+    )
+    return stats
+
+
+def _snapshot_key(today):
+    # a fresh generation after an eviction too, so old snapshots can't come back
+    generation = cache.get_or_set(STATS_GENERATION_KEY, time.time_ns, None)
+    return f"{STATS_CACHE_KEY}:{generation}:{today}:{timezone.get_current_timezone_name()}"
+
+
+def dashboard_stats(today):
+    """
+    All dashboard numbers from a handful of aggregate queries, kept as a cached
+    snapshot per day and time zone. The keys carry a generation number, so the
+    signals drop every snapshot at once when events, RSVPs or users change.
+    """
+    key = _snapshot_key(today)
+    stats = cache.get(key)
+    if stats is None:
+        stats = _compute(today)
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def forget_dashboard_stats():
+    try:
+        cache.incr(STATS_GENERATION_KEY)
+    except ValueError:
+        pass  # no generation yet, the next snapshot starts a fresh one
@@ -0,0 +1,65 @@
+import gzip
+import logging
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip variants without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico')
+# skip the variant unless it saves at least this share of the bytes
+MIN_SAVING = 0.05
+MIN_SIZE = 256
+
+
+def _variants(content):
+    yield 'gz', gzip.compress(content, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield 'br', brotli.compress(content, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic writes content-hashed names (css/output.3f2a9c.css) plus a
+    .gz and, with the brotli package installed, a .br next to every text file,
+    so events.files.serve_static() never compresses on the fly.
+
+    Until collectstatic has run there is no manifest; {% static %} then returns
+    the plain names and serve_static() finds the files in STATICFILES_DIRS.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in dict.fromkeys(hashed):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as f:
+            content = f.read()
+        if len(content) < MIN_SIZE:
+            return
+        for ext, compressed in _variants(content):
+            if len(compressed) > len(content) * (1 - MIN_SAVING):
+                continue
+            variant = f'{name}.{ext}'
+            if self.exists(variant):
+                self.delete(variant)
+            self._save(variant, ContentFile(compressed))
+            logger.debug("Wrote %s (%d -> %d bytes)", variant, len(content), len(compressed))
@@ -1,4 +1,8 @@
 from django import template
+from django.utils.safestring import mark_safe
+
+from ..caching import render_fragments
+from ..helpers import has_role
 
 register = template.Library()
 
@@ -9,4 +13,14 @@ def has_group(user, group_names):
     Usage: {% if user|has_group:"Admin,Organizer" %}
     """
     groups = group_names.split(',')
-    return user.groups.filter(name__in=groups).exists()
+    return has_role(user, *groups)
+
+
+@register.simple_tag
+def event_cards(events, compact=False):
+    """
+    The rendered _event_card.html of each event, from the fragment cache.
+    Usage: {% event_cards events compact=True as cards %}{% for card in cards %}{{ card }}{% endfor %}
+    """
+    cards = render_fragments('event-card', 'events/_event_card.html', events, compact=bool(compact))
+    return [mark_safe(card) for card in cards]
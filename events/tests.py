@@ -1,3 +1,1393 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import zoneinfo
+from datetime import date, datetime, time, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .booking import book_seat
+from .forms import EventForm
+from . import caching
+from .caching import cached_render, fragment_key
+from .feeds import _fold, feed_token
+from .helpers import ROLE_GROUPS, group_id, has_role
+from .images import variant_name
+from .management.commands.run_benchmarks import percentile
+from .management.commands.stress_rsvp import run_burst
+from .middleware import ReplicaPinningMiddleware
+from .pagination import EstimatedCountPaginator
+from .models import Category, CustomUser, Event, EventSeries, RSVP, OutboundEmail, ReminderLog, day_bounds
+from .recurrence import parse_rule
+from .reminders import send_reminders
+from .routers import PrimaryReplicaRouter, RoutingState, request_state
+from .stats import dashboard_stats
+from .views import EventListView
+
+
+def make_user(username, *groups, **extra):
+    user = CustomUser.objects.create_user(username=username, password='pass12345', **extra)
+    # new users are created inactive until they click the activation link
+    CustomUser.objects.filter(pk=user.pk).update(is_active=True)
+    for name in groups:
+        user.groups.add(Group.objects.get_or_create(name=name)[0])
+    user.refresh_from_db()
+    return user
+
+
+def make_event(organizer, **fields):
+    """Today at 20:00 in Dhaka, in the 'Music' category unless fields say otherwise."""
+    if 'category' not in fields:
+        fields['category'] = Category.objects.get_or_create(name='Music')[0]
+    defaults = {
+        'name': 'Gig', 'description': '...', 'date': timezone.localdate(), 'time': time(20, 0), 'location': 'Dhaka',
+    }
+    return Event.objects.create(organizer=organizer, **{**defaults, **fields})
+
+
+class QueryCountTests(TestCase):
+    """
+    Every page must run a fixed number of queries no matter how many
+    events / RSVPs it shows. Raise a budget only on purpose.
+    """
+    BUDGETS = {
+        # + the two aggregates behind the list's ETag / Last-Modified
+        # and the recurring events of the page's dates
+        'event_list': 5,
+        # with the shared fragments not cached yet
+        'event_detail': 6,
+        'my_events': 3,
+        'participant_dashboard': 3,
+        # both with today's recurring events
+        'organizer_dashboard': 9,
+        'admin_dashboard': 8,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.admin = make_user('admin', 'Admin', is_superuser=True)
+        cls.participant = make_user('participant', 'Participant')
+        attendees = [make_user(f'attendee{i}') for i in range(10)]
+        today = timezone.localdate()
+        for c in range(3):
+            category = Category.objects.create(name=f'Category {c}')
+            for i in range(5):
+                event = make_event(
+                    cls.organizer, name=f'Event {c}-{i}', date=today + timedelta(days=i - 2), time=time(18, 0),
+                    category=category,
+                )
+                RSVP.objects.create(user=cls.participant, event=event)
+                for user in attendees:
+                    RSVP.objects.create(user=user, event=event)
+        cls.event = Event.objects.first()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertQueryBudget(self, name, url, user=None):
+        if user:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(ctx.captured_queries), self.BUDGETS[name],
+            f"{name} ran {len(ctx.captured_queries)} queries:\n"
+            + "\n".join(q['sql'] for q in ctx.captured_queries),
+        )
+        return response
+
+    def test_event_list(self):
+        response = self.assertQueryBudget('event_list', reverse('event_list'))
+        self.assertEqual(response.context['events'][0].participant_count, 11)
+
+    def test_event_detail(self):
+        url = reverse('event_detail', args=[self.event.pk])
+        self.assertQueryBudget('event_detail', url, self.participant)
+        # session, user, event, roles, the user's own RSVP
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+    def test_my_events(self):
+        response = self.assertQueryBudget('my_events', reverse('my_events'), self.participant)
+        self.assertEqual(len(response.context['events']), 15)
+        self.assertEqual(response.context['events'][0].participant_count, 11)
+
+    def test_participant_dashboard(self):
+        self.assertQueryBudget('participant_dashboard', reverse('participant_dashboard'), self.participant)
+
+    def test_organizer_dashboard(self):
+        self.assertQueryBudget('organizer_dashboard', reverse('organizer_dashboard'), self.organizer)
+
+    def test_admin_dashboard(self):
+        self.assertQueryBudget('admin_dashboard', reverse('admin_dashboard'), self.admin)
+
+    def test_dashboard_stats_snapshot(self):
+        self.client.force_login(self.organizer)
+        self.client.get(reverse('organizer_dashboard'))
+        # session, user, roles, today's events, today's recurring events
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('organizer_dashboard'))
+        self.assertEqual(response.context['stats']['total_rsvps'], 165)
+
+        RSVP.objects.create(user=self.organizer, event=self.event)
+        response = self.client.get(reverse('organizer_dashboard'))
+        self.assertEqual(response.context['stats']['total_rsvps'], 166)
+
+    def test_new_event_drops_snapshot(self):
+        today = timezone.localdate()
+        total = dashboard_stats(today)['total_events']
+        with self.assertNumQueries(0):
+            dashboard_stats(today)
+        make_event(self.organizer, name='New', date=today, time=time(18, 0), category=self.event.category)
+        self.assertEqual(dashboard_stats(today)['total_events'], total + 1)
+
+    def test_rsvps_per_day_window(self):
+        today = timezone.localdate()
+        first_day = today - timedelta(days=13)
+        first, second = RSVP.objects.order_by('pk').values_list('pk', flat=True)[:2]
+        RSVP.objects.filter(pk=first).update(created_at=day_bounds(first_day)[0])
+        RSVP.objects.filter(pk=second).update(created_at=day_bounds(first_day)[0] - timedelta(seconds=1))
+        per_day = {row['day']: row['rsvps'] for row in dashboard_stats(today)['rsvps_per_day']}
+        self.assertEqual(per_day[first_day], 1)
+        self.assertNotIn(first_day - timedelta(days=1), per_day)
+        self.assertEqual(per_day[today], 163)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("SMTP server unavailable")
+
+
+class OutboxTests(TestCase):
+    def test_signup_queues_activation_instead_of_sending(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.create_user(username='newbie', email='newbie@example.com', password='x')
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.recipients, ['newbie@example.com'])
+
+        call_command('send_queued_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('/activate/', mail.outbox[0].body)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboundEmail.SENT)
+
+    def test_nothing_queued_when_transaction_rolls_back(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            CustomUser.objects.create_user(username='ghost', email='ghost@example.com', password='x')
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    @override_settings(EMAIL_BACKEND='events.tests.FailingEmailBackend')
+    def test_failed_send_is_retried_with_backoff(self):
+        email = OutboundEmail.objects.create(subject='Hi', body='...', recipients=['a@example.com'])
+        call_command('send_queued_emails', stdout=StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('unavailable', email.last_error)
+
+
+class ReminderTests(TestCase):
+    NOW = datetime(2026, 10, 20, 10, 0, tzinfo=timezone.get_fixed_timezone(0))
+
+    @classmethod
+    def setUpTestData(cls):
+        organizer = make_user('organizer', 'Organizer')
+        category = Category.objects.create(name='Music')
+        cls.users = [make_user(f'user{i}', email=f'user{i}@example.com') for i in range(3)]
+
+        def event(name, day, hour, minute=0):
+            return make_event(
+                organizer, name=name, date=day, time=time(hour, minute), category=category, capacity=2,
+            )
+        today, tomorrow = date(2026, 10, 20), date(2026, 10, 21)
+        cls.soon = event('Soon', today, 10, 30)
+        cls.tomorrow = event('Tomorrow', tomorrow, 9)
+        later = event('Later', tomorrow, 11)
+        past = event('Past', today, 9)
+        for e in (cls.soon, cls.tomorrow, later, past):
+            for user in cls.users:
+                book_seat(e, user)  # the third one is waitlisted
+
+    def test_due_reminders_are_sent_once(self):
+        self.assertEqual(send_reminders(self.NOW), 4)
+        self.assertEqual(
+            sorted((m.subject, m.to[0]) for m in mail.outbox),
+            [('Coming up: Tomorrow', 'user0@example.com'), ('Coming up: Tomorrow', 'user1@example.com'),
+             ('Starting in an hour: Soon', 'user0@example.com'), ('Starting in an hour: Soon', 'user1@example.com')],
+        )
+        # a second run, or a restarted dispatcher, finds them all claimed
+        self.assertEqual(send_reminders(self.NOW + timedelta(minutes=1)), 0)
+        self.assertEqual(ReminderLog.objects.count(), 4)
+
+        # the next morning: the hour-before reminders of 'Tomorrow', the day-before ones of 'Later'
+        self.assertEqual(send_reminders(datetime(2026, 10, 21, 8, 30, tzinfo=timezone.get_fixed_timezone(0))), 4)
+        self.assertEqual(
+            sorted({m.subject for m in mail.outbox[4:]}), ['Coming up: Later', 'Starting in an hour: Tomorrow'],
+        )
+
+    def test_failed_sends_are_retried(self):
+        with override_settings(EMAIL_BACKEND='events.tests.FailingEmailBackend'):
+            with self.assertLogs('events.reminders', 'WARNING'):
+                self.assertEqual(send_reminders(self.NOW), 0)
+        self.assertFalse(ReminderLog.objects.exists())
+        self.assertEqual(send_reminders(self.NOW), 4)
+
+    def test_batches_stream_over_one_connection(self):
+        with mock.patch('events.reminders.get_connection', wraps=mail.get_connection) as get_connection:
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(send_reminders(self.NOW, batch_size=1), 4)
+        get_connection.assert_called_once()
+        # the due events, the attendees of each kind, then one claim per batch
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('SELECT')]), 3)
+
+
+class RoleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.event = make_event(cls.organizer)
+
+    def test_groups_loaded_once_per_request(self):
+        self.client.force_login(self.organizer)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('event_list'))
+            self.client.get(reverse('event_detail', args=[self.event.pk]))
+        group_queries = [q for q in ctx.captured_queries if 'auth_group' in q['sql']]
+        self.assertEqual(len(group_queries), 2)
+
+    @override_settings(ROLE_CACHE_TIMEOUT=60)
+    def test_cross_request_cache_invalidated_on_group_change(self):
+        cache.clear()
+        self.assertFalse(has_role(CustomUser.objects.get(pk=self.organizer.pk), 'Admin'))
+        user = CustomUser.objects.get(pk=self.organizer.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(has_role(user, 'Organizer'))
+
+        user.groups.add(Group.objects.get_or_create(name='Admin')[0])
+        self.assertTrue(has_role(user, 'Admin'))
+        self.assertTrue(has_role(CustomUser.objects.get(pk=user.pk), 'Admin'))
+
+        Group.objects.get(name='Admin').user_set.remove(user)
+        self.assertFalse(has_role(CustomUser.objects.get(pk=user.pk), 'Admin'))
+
+
+class SignupTests(TestCase):
+    def test_signup_is_one_insert_plus_group(self):
+        group_id('Participant')  # looked up once per process
+        with self.captureOnCommitCallbacks(execute=False):
+            # INSERT the (already inactive) user, INSERT the Participant membership
+            with self.assertNumQueries(2):
+                user = CustomUser.objects.create_user(username='newbie', email='newbie@example.com', password='x')
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+        self.assertTrue(has_role(user, 'Participant'))
+
+    def test_saving_existing_user_is_one_query(self):
+        user = make_user('someone')
+        user.first_name = 'Some'
+        with self.assertNumQueries(1):
+            user.save()
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+
+    def test_staff_stays_active_without_group(self):
+        user = CustomUser.objects.create_user(username='staffer', password='x', is_staff=True)
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+        self.assertFalse(user.groups.exists())
+
+    def test_signup_view(self):
+        data = {
+            'username': 'newbie', 'email': 'newbie@example.com', 'first_name': 'New', 'last_name': 'Bie',
+            'password1': 'a-long-pass-123', 'password2': 'a-long-pass-123',
+        }
+        group_id('Participant')
+        with self.captureOnCommitCallbacks(execute=True):
+            # username uniqueness check, user, membership, outbox row
+            with self.assertNumQueries(4):
+                response = self.client.post(reverse('signup'), data)
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(OutboundEmail.objects.get().recipients, ['newbie@example.com'])
+
+    def test_groups_exist_after_migrate(self):
+        self.assertEqual(
+            set(Group.objects.filter(name__in=ROLE_GROUPS).values_list('name', flat=True)), set(ROLE_GROUPS)
+        )
+
+
+class ParticipantCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.users = [make_user(f'user{i}') for i in range(3)]
+        cls.event = make_event(cls.organizer)
+
+    def count(self):
+        return Event.objects.values_list('participant_count', flat=True).get(pk=self.event.pk)
+
+    def test_counter_follows_create_and_delete(self):
+        rsvp = RSVP.objects.create(user=self.users[0], event=self.event)
+        RSVP.objects.create(user=self.users[1], event=self.event)
+        self.assertEqual(self.count(), 2)
+        rsvp.delete()
+        self.assertEqual(self.count(), 1)
+        RSVP.objects.filter(event=self.event).delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_counter_follows_bulk_create(self):
+        RSVP.objects.bulk_create([RSVP(user=u, event=self.event) for u in self.users[:2]])
+        self.assertEqual(self.count(), 2)
+        RSVP.objects.bulk_create([RSVP(user=u, event=self.event) for u in self.users], ignore_conflicts=True)
+        self.assertEqual(self.count(), 3)
+
+    def test_recount_repairs_drift(self):
+        RSVP.objects.create(user=self.users[0], event=self.event)
+        Event.objects.filter(pk=self.event.pk).update(participant_count=42)
+        call_command('recount_participants', stdout=StringIO())
+        self.assertEqual(self.count(), 1)
+
+
+class CapacityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.users = [make_user(f'user{i}') for i in range(3)]
+        cls.event = make_event(cls.organizer, capacity=2)
+
+    def test_full_event_waitlists_and_promotes_on_cancel(self):
+        first, _ = book_seat(self.event, self.users[0])
+        book_seat(self.event, self.users[1])
+        third, _ = book_seat(self.event, self.users[2])
+        self.assertEqual(third.status, RSVP.WAITLISTED)
+
+        first.delete()
+        third.refresh_from_db()
+        self.assertEqual(third.status, RSVP.CONFIRMED)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participant_count, 2)
+
+    def test_raising_capacity_promotes_waitlist(self):
+        for user in self.users:
+            book_seat(self.event, user)
+        self.event.capacity = 3
+        self.event.save()
+        self.assertFalse(RSVP.objects.filter(status=RSVP.WAITLISTED).exists())
+
+    def test_recount_ignores_waitlist(self):
+        for user in self.users:
+            book_seat(self.event, user)
+        version = Event.objects.values_list('version', flat=True).get(pk=self.event.pk)
+        out = StringIO()
+        call_command('recount_participants', stdout=out)
+        self.assertNotIn(f'Event {self.event.pk}:', out.getvalue())
+        self.assertIn('0 event(s) repaired', out.getvalue())
+        self.assertEqual(Event.objects.values_list('version', flat=True).get(pk=self.event.pk), version)
+
+    def test_cancel_view(self):
+        book_seat(self.event, self.users[0])
+        self.client.force_login(self.users[0])
+        self.client.post(reverse('event_rsvp_cancel', args=[self.event.pk]))
+        self.assertFalse(RSVP.objects.exists())
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.users = [make_user(f'user{i}') for i in range(2)]
+        cls.category = Category.objects.create(name='Music')
+        cls.event = make_event(cls.organizer, category=cls.category)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_event_detail_not_modified_until_rsvp(self):
+        url = reverse('event_detail', args=[self.event.pk])
+        self.client.force_login(self.users[0])
+        self.client.get(url)  # sets the CSRF cookie, which is part of the ETag
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+
+        book_seat(self.event, self.users[1])
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'user1')
+        self.assertFalse(response.context['user_has_rsvped'])
+
+    def test_etag_is_per_user(self):
+        url = reverse('event_detail', args=[self.event.pk])
+        self.client.force_login(self.users[0])
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.users[1])
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 200)
+
+    def test_event_list_changes_with_category_rename(self):
+        url = reverse('event_list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+        self.category.name = 'Live music'
+        self.category.save()
+        self.assertContains(self.client.get(url, headers={'if-none-match': etag}), 'Live music')
+
+    def test_stale_save_keeps_participant_count(self):
+        stale = Event.objects.get(pk=self.event.pk)
+        book_seat(self.event, self.users[0])
+        stale.name = 'Renamed gig'
+        stale.save()
+        fresh = Event.objects.get(pk=self.event.pk)
+        self.assertEqual(fresh.participant_count, 1)
+        self.assertEqual(stale.version, fresh.version)
+        self.assertGreater(fresh.version, self.event.version)
+
+    def test_cached_render_serves_stale_copy_while_locked(self):
+        renders = []
+        def render():
+            renders.append(1)
+            return len(renders)
+
+        self.assertEqual(cached_render('k', render, timeout=60), 1)
+        self.assertEqual(cached_render('k', render, timeout=60), 1)
+        # expired, and another request is already re-rendering it
+        cache.set('k', (0, 1))
+        cache.add('k:lock', 1)
+        self.assertEqual(cached_render('k', render, timeout=60), 1)
+        self.assertEqual(len(renders), 1)
+        cache.delete('k:lock')
+        self.assertEqual(cached_render('k', render, timeout=60), 2)
+
+
+class AsyncViewTests(TestCase):
+    # AsyncClient goes through the ASGI handler, like uvicorn / daphne would
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.user = make_user('someone')
+        cls.event = make_event(cls.organizer, capacity=1)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_rsvp_and_detail(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(reverse('event_rsvp', args=[self.event.pk]))
+        self.assertRedirects(response, reverse('event_detail', args=[self.event.pk]), fetch_redirect_response=False)
+
+        response = await self.async_client.get(reverse('event_detail', args=[self.event.pk]))
+        self.assertTrue(response.context['user_has_rsvped'])
+        self.assertContains(response, 'Seats left: 0 / 1')
+        # the first page set the CSRF cookie, which is part of the ETag
+        etag = (await self.async_client.get(reverse('event_detail', args=[self.event.pk])))['ETag']
+        response = await self.async_client.get(reverse('event_detail', args=[self.event.pk]), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_list_and_dashboards(self):
+        response = await self.async_client.get(reverse('event_list'))
+        self.assertContains(response, 'Gig')
+        response = await self.async_client.get(reverse('organizer_dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+        await self.async_client.aforce_login(self.organizer)
+        response = await self.async_client.get(reverse('organizer_dashboard'))
+        self.assertEqual(response.context['stats']['total_events'], 1)
+        response = await self.async_client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+
+class CapacityStressTest(TransactionTestCase):
+    def test_burst_never_oversells(self):
+        organizer = CustomUser.objects.create(username='organizer', is_staff=True)
+        event = make_event(organizer, name='Ticket drop', capacity=20)
+        CustomUser.objects.bulk_create([CustomUser(username=f'fan{i}') for i in range(120)])
+        users = list(CustomUser.objects.filter(username__startswith='fan'))
+
+        run_burst(event, users, threads=16)
+
+        event.refresh_from_db()
+        confirmed = RSVP.objects.filter(event=event, status=RSVP.CONFIRMED).count()
+        self.assertEqual(confirmed, 20)
+        self.assertEqual(event.participant_count, 20)
+        self.assertEqual(RSVP.objects.filter(event=event, status=RSVP.WAITLISTED).count(), 100)
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_upload_creates_variants(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 900), 'purple').save(buffer, 'PNG')
+        with self.settings(MEDIA_ROOT=self.media_root):
+            event = make_event(make_user('organizer'), image=SimpleUploadedFile('poster.png', buffer.getvalue()))
+            folder = f'{self.media_root}/events/images'
+            self.assertEqual(
+                sorted(f for f in os.listdir(folder) if f != 'poster.png'),
+                ['poster-png_480w.jpg', 'poster-png_480w.webp', 'poster-png_960w.jpg', 'poster-png_960w.webp'],
+            )
+            with Image.open(f'{folder}/poster-png_480w.webp') as variant:
+                self.assertEqual(variant.size, (480, 270))
+            self.assertIn('/media/events/images/poster-png_960w.webp 960w', event.image_webp_srcset)
+            self.assertEqual(event.image_card_url, '/media/events/images/poster-png_480w.jpg')
+
+    def test_same_stem_gets_own_variants(self):
+        self.assertNotEqual(
+            variant_name('events/images/poster.png', 480, 'jpg'),
+            variant_name('events/images/poster.jpg', 480, 'jpg'),
+        )
+
+    def test_original_until_variants_exist(self):
+        with self.settings(MEDIA_ROOT=self.media_root):
+            event = Event(name='Gig', image='events/images/old.png')
+            self.assertEqual(event.image_card_url, '/media/events/images/old.png')
+            self.assertEqual(event.image_srcset, '')
+            self.assertEqual(event.image_webp_srcset, '')
+            user = CustomUser(username='old', profile_picture='users/images/old.jpg')
+            self.assertEqual(user.avatar_url, '/media/users/images/old.jpg')
+            self.assertEqual(user.avatar_srcset, '')
+
+
+class ImportExportTests(TestCase):
+    def test_round_trip(self):
+        organizer = make_user('organizer', 'Organizer')
+        Category.objects.create(name='Music')
+        feed = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, feed.name)
+        feed.write(
+            "name,description,date,time,location,category,capacity\n"
+            "Gig,Live band,2030-01-05,20:00,Dhaka,Music,100\n"
+            "Talk,Tech talk,2030-01-06,18:30,Khulna,Tech,\n"
+            "Broken,No date,,18:30,Khulna,Music,\n"
+        )
+        feed.close()
+
+        err = StringIO()
+        call_command('import_events', feed.name, organizer='organizer', create_categories=True,
+                     batch_size=1, stdout=StringIO(), stderr=err)
+        self.assertEqual(Event.objects.count(), 2)
+        self.assertIn('Row 3', err.getvalue())
+        self.assertEqual(Event.objects.get(name='Talk').category.name, 'Tech')
+
+        out = StringIO()
+        call_command('export_events', format='jsonl', stdout=out, stderr=StringIO())
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r['name'] for r in rows], ['Gig', 'Talk'])
+        self.assertEqual(rows[0]['capacity'], 100)
+        self.assertEqual(rows[0]['organizer'], organizer.username)
+
+
+class BenchmarkToolTests(TestCase):
+    def test_seed_demo_data(self):
+        call_command(
+            'seed_demo_data', users=30, categories=4, events=50, rsvps=300, seed=1, batch_size=40,
+            stdout=StringIO(),
+        )
+        self.assertEqual(CustomUser.objects.count(), 30)
+        self.assertEqual(Category.objects.count(), 4)
+        self.assertEqual(Event.objects.count(), 50)
+        self.assertTrue(CustomUser.objects.filter(groups__name='Organizer').exists())
+        for event in Event.objects.all():
+            confirmed = event.rsvps.filter(status=RSVP.CONFIRMED).count()
+            self.assertEqual(event.participant_count, confirmed)
+            if event.capacity is not None:
+                self.assertLessEqual(confirmed, event.capacity)
+        # skewed: the busiest event has far more RSVPs than the median one
+        counts = sorted(Event.objects.values_list('participant_count', flat=True))
+        self.assertGreater(counts[-1], 3 * counts[len(counts) // 2])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_event(make_user('organizer', 'Organizer'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_REQUEST_MS=None)
+    def test_sampled_request_gets_server_timing_and_log(self):
+        with self.assertLogs('events.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('event_list'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="5 queries", tpl;dur=[\d.]+')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'event_list')
+        self.assertEqual(record['queries'], 5)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertIn('SELECT', record['slowest_sql'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_SLOW_REQUEST_MS=0)
+    def test_slow_request_logged_without_sampling(self):
+        with self.assertLogs('events.profiling', 'WARNING') as logs:
+            response = self.client.get(reverse('event_list'))
+        self.assertNotIn('Server-Timing', response)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record['slow'])
+        self.assertNotIn('queries', record)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def route(self, state, model=Event):
+        token = request_state.set(state)
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            request_state.reset(token)
+
+    def test_reads_in_a_request_go_to_one_replica(self):
+        state = RoutingState()
+        alias = self.route(state)
+        self.assertIn(alias, ['replica1', 'replica2'])
+        self.assertEqual({self.route(state, model) for model in (Event, RSVP, Category)}, {alias})
+        self.assertEqual(self.route(state, Group), 'default')  # not the events app
+
+    def test_primary_when_pinned_outside_requests_or_without_replicas(self):
+        self.assertEqual(self.route(RoutingState(pinned=True)), 'default')
+        self.assertEqual(self.router.db_for_read(Event), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.route(RoutingState()), 'default')
+
+    def test_a_write_pins_the_rest_of_the_request(self):
+        state = RoutingState()
+        token = request_state.set(state)
+        try:
+            self.assertEqual(self.router.db_for_write(RSVP), 'default')
+        finally:
+            request_state.reset(token)
+        self.assertTrue(state.wrote)
+        self.assertEqual(self.route(state), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'events'))
+
+    def test_middleware_sets_and_honours_the_pin_cookie(self):
+        factory = RequestFactory()
+        seen = []
+
+        def view(request):
+            state = request_state.get()
+            seen.append(state.pinned)
+            if request.GET.get('write'):
+                self.router.db_for_write(RSVP)
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        response = middleware(factory.get('/'))
+        self.assertNotIn('primary_pin', response.cookies)
+        response = middleware(factory.get('/', {'write': 1}))
+        self.assertEqual(response.cookies['primary_pin']['max-age'], settings.REPLICA_PIN_SECONDS)
+        middleware(factory.post('/'))
+        request = factory.get('/')
+        request.COOKIES['primary_pin'] = '1'
+        middleware(request)
+        self.assertEqual(seen, [False, False, True, True])
+        self.assertIsNone(request_state.get())
+
+
+@skipUnless('replica1' in settings.DATABASES, "set REPLICA_DATABASE_URLS to run against a replica")
+class ReplicaRoutingTests(TransactionTestCase):
+    # TestCase wraps each test in a transaction, which keeps every read on the primary
+    databases = '__all__'
+
+    def setUp(self):
+        self.event = make_event(make_user('organizer'))
+        self.user = make_user('fan')
+
+    def queries(self, method, url):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as replica:
+            response = getattr(self.client, method)(url)
+        return response, len(primary.captured_queries), len(replica.captured_queries)
+
+    def test_browsing_reads_from_the_replica_until_the_user_writes(self):
+        detail = reverse('event_detail', args=[self.event.pk])
+        response, primary, replica = self.queries('get', detail)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+        self.client.force_login(self.user)
+        response, primary, replica = self.queries('post', reverse('event_rsvp', args=[self.event.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(replica, 0)
+        self.assertIn('primary_pin', response.cookies)
+
+        # the RSVP is read back from the primary
+        response, primary, replica = self.queries('get', detail)
+        self.assertTrue(response.context['user_has_rsvped'])
+        self.assertEqual(replica, 0)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.participant = make_user('participant')
+        cls.music = Category.objects.create(name='Music')
+        cls.art = Category.objects.create(name='Art')
+        today = timezone.localdate()
+        cls.events = [
+            make_event(
+                cls.organizer, name=f'Event {i}', date=today + timedelta(days=i), time=time(18, 0),
+                category=cls.music if i % 2 else cls.art, capacity=10,
+            )
+            for i in range(5)
+        ]
+        RSVP.objects.create(user=cls.participant, event=cls.events[3])
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content) if response.streaming else response.content)
+
+    def test_event_list_pages_with_cursor(self):
+        data = self.get_json(reverse('api_event_list'), limit=2, fields='id,name,seats_left')
+        self.assertEqual([e['name'] for e in data['results']], ['Event 4', 'Event 3'])
+        self.assertEqual(set(data['results'][0]), {'id', 'name', 'seats_left'})
+        self.assertEqual(data['results'][1]['seats_left'], 9)
+        self.assertIsNone(data['previous'])
+
+        data = self.get_json(data['next'])
+        self.assertEqual([e['name'] for e in data['results']], ['Event 2', 'Event 1'])
+        self.assertEqual(self.get_json(data['previous'])['results'][0]['name'], 'Event 4')
+
+    def test_event_list_filters_and_sparse_select(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.get_json(reverse('api_event_list'), category=self.music.pk, fields='name')
+        self.assertEqual([e['name'] for e in data['results']], ['Event 3', 'Event 1'])
+        # two for the ETag, one for the page, which SELECTs only what it needs
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertNotIn('description', ctx.captured_queries[-1]['sql'])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('api_event_list'), {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_event_detail_etag(self):
+        url = reverse('api_event_detail', args=[self.events[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['category_name'], 'Art')
+        self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 304)
+        book_seat(self.events[0], self.participant)
+        response = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.json()['participant_count'], 1)
+        self.assertEqual(self.client.get(reverse('api_event_detail', args=[999])).status_code, 404)
+
+    def test_event_list_etag(self):
+        url = reverse('api_event_list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+        Event.objects.filter(pk=self.events[0].pk).touch()
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 200)
+
+    def test_categories(self):
+        data = self.get_json(reverse('api_category_list'), fields='name')
+        self.assertEqual(data, {'results': [{'name': 'Art'}, {'name': 'Music'}]})
+
+    def test_my_rsvps(self):
+        self.assertEqual(self.client.get(reverse('api_my_rsvps')).status_code, 401)
+        self.client.force_login(self.participant)
+        data = self.get_json(reverse('api_my_rsvps'))
+        self.assertEqual(data['results'][0]['event_name'], 'Event 3')
+        self.assertEqual(data['results'][0]['status'], RSVP.CONFIRMED)
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        organizer = make_user('organizer', 'Organizer')
+        cls.participant = make_user('participant')
+        cls.category = Category.objects.create(name='Music')
+        cls.events = [
+            make_event(
+                organizer, name=f'Event {i}', date=timezone.localdate() + timedelta(days=i), time=time(18, 0),
+                category=cls.category,
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def card_key(self, event, compact=False):
+        event.refresh_from_db()
+        return f"{fragment_key('event-card', event)}:compact={compact}"
+
+    def test_cached_empty_fragment_is_kept(self):
+        event = self.events[0]
+        cache.set(self.card_key(event), '')
+        fragments = caching.render_fragments('event-card', 'events/_event_card.html', [event], compact=False)
+        self.assertEqual(fragments, [''])
+
+    def test_cards_take_one_round_trip(self):
+        with mock.patch.object(caching, 'cache', wraps=cache) as spy:
+            self.client.get(reverse('event_list'))
+            self.assertEqual((spy.get_many.call_count, spy.set_many.call_count), (1, 1))
+            self.assertEqual(len(spy.set_many.call_args.args[0]), 5)
+            spy.reset_mock()
+            self.client.get(reverse('event_list'), {'category': self.category.pk})
+            self.assertEqual((spy.get_many.call_count, spy.set_many.call_count), (1, 0))
+
+    def test_cached_card_is_reused_until_the_event_changes(self):
+        event = self.events[0]
+        self.client.get(reverse('event_list'))
+        cache.set(self.card_key(event), '<p>from the cache</p>')
+        self.assertContains(self.client.get(reverse('event_list'), {'q': 'Event'}), 'from the cache')
+
+        book_seat(event, self.participant)
+        response = self.client.get(reverse('event_list'), {'q': 'Event 0'})
+        self.assertNotContains(response, 'from the cache')
+        self.assertContains(response, 'Participants: 1')
+
+    def test_category_rename_reaches_the_cards(self):
+        RSVP.objects.create(user=self.participant, event=self.events[1])
+        self.client.force_login(self.participant)
+        self.assertContains(self.client.get(reverse('participant_dashboard')), 'Music •')
+        self.category.name = 'Jazz'
+        self.category.save()
+        self.assertContains(self.client.get(reverse('my_events')), 'Jazz •')
+        self.assertIsNotNone(cache.get(self.card_key(self.events[1], compact=True)))
+
+
+class AttendeeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.other_organizer = make_user('other', 'Organizer')
+        cls.event = make_event(cls.organizer, name='Concert', time=time(18, 0), capacity=3)
+        cls.other_event = make_event(cls.organizer, name='Other', time=time(18, 0))
+        cls.attendees = [make_user(f'attendee{i}') for i in range(4)]
+        cls.rsvps = [book_seat(cls.event, user)[0] for user in cls.attendees]  # the last one is waitlisted
+        cls.elsewhere = book_seat(cls.other_event, cls.attendees[0])[0]
+
+    def test_export_csv_streams_every_rsvp(self):
+        self.client.force_login(self.organizer)
+        response = self.client.get(reverse('event_attendees_export', args=[self.event.pk]))
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="event-', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'rsvp,username,first_name,last_name,email,status,rsvp_at,checked_in_at')
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], [u.username for u in self.attendees])
+        self.assertEqual(lines[-1].split(',')[5], RSVP.WAITLISTED)
+
+    def test_export_json_reads_no_instances(self):
+        self.client.force_login(self.organizer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('event_attendees_export', args=[self.event.pk]), {'format': 'json'})
+            rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['username'], 'attendee0')
+        self.assertIsNone(rows[0]['checked_in_at'])
+        # session, user, roles, event, rows
+        self.assertLessEqual(len(ctx.captured_queries), 5)
+
+    def test_only_the_organizer_can_export_or_check_in(self):
+        url = reverse('event_attendees_export', args=[self.event.pk])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        for user in (self.attendees[0], self.other_organizer):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get(url).status_code, 403)
+            response = self.client.post(reverse('event_check_in', args=[self.event.pk]), {'rsvp': self.rsvps[0].pk})
+            self.assertEqual(response.status_code, 403)
+
+    def test_export_links_only_for_who_can_export(self):
+        url = reverse('event_detail', args=[self.event.pk])
+        export = reverse('event_attendees_export', args=[self.event.pk])
+        self.client.force_login(self.other_organizer)
+        self.assertNotContains(self.client.get(url), export)
+        self.client.force_login(self.organizer)
+        self.assertContains(self.client.get(url), export)
+
+    def test_bulk_check_in_is_one_update(self):
+        self.client.force_login(self.organizer)
+        url = reverse('event_check_in', args=[self.event.pk])
+        ids = [r.pk for r in self.rsvps] + [self.elsewhere.pk]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {'rsvp': ids})
+        # confirmed RSVPs of this event only
+        self.assertEqual(response.json(), {'updated': 3})
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in ctx.captured_queries), 1)
+        self.assertEqual(RSVP.objects.filter(checked_in_at__isnull=False).count(), 3)
+
+        first = RSVP.objects.get(pk=self.rsvps[0].pk).checked_in_at
+        self.assertEqual(self.client.post(url, {'rsvp': ids}).json(), {'updated': 0})
+        self.assertEqual(RSVP.objects.get(pk=self.rsvps[0].pk).checked_in_at, first)
+
+        self.assertEqual(self.client.post(url, {'rsvp': [self.rsvps[0].pk], 'undo': '1'}).json(), {'updated': 1})
+        self.assertEqual(self.client.post(url, {'rsvp': 'x'}).status_code, 400)
+        self.assertEqual(self.client.post(url).status_code, 400)
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.participant = make_user('participant')
+        cls.music = Category.objects.create(name='Music')
+        today = timezone.localdate()
+        cls.concert = make_event(
+            cls.organizer, name='Concert, live; outdoors', description='Bring a chair\nand water',
+            date=today + timedelta(days=2), time=time(18, 0), category=cls.music,
+        )
+        cls.old = make_event(
+            cls.organizer, name='Long gone', date=today - timedelta(days=90), time=time(18, 0), category=cls.music,
+        )
+        RSVP.objects.create(user=cls.participant, event=cls.concert)
+        RSVP.objects.create(user=cls.participant, event=cls.old)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_ics(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        return response, (b''.join(response.streaming_content) if response.streaming else response.content).decode()
+
+    def test_rsvp_feed_needs_no_session(self):
+        url = reverse('rsvp_feed', args=[feed_token(self.participant)])
+        response, body = self.get_ics(url)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)  # the old event is outside the window
+        self.assertIn('SUMMARY:Concert\\, live\\; outdoors\r\n', body)
+        self.assertIn('DESCRIPTION:Bring a chair\\nand water\r\n', body)
+        self.assertIn('STATUS:CONFIRMED', body)
+
+        forged = feed_token(self.participant)[:-1] + 'x'
+        self.assertEqual(self.client.get(reverse('rsvp_feed', args=[forged])).status_code, 404)
+
+    def test_rsvp_feed_is_cached_by_version(self):
+        url = reverse('rsvp_feed', args=[feed_token(self.participant)])
+        response, body = self.get_ics(url)
+        self.assertTrue(response.streaming)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        # same version: served from the cache without reading the rows
+        with CaptureQueriesContext(connection) as ctx:
+            cached, cached_body = self.get_ics(url)
+        self.assertFalse(cached.streaming)
+        self.assertEqual(cached_body, body)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        Event.objects.filter(pk=self.concert.pk).update(name='Renamed')
+        Event.objects.filter(pk=self.concert.pk).touch()
+        response, body = self.get_ics(url, if_none_match=response['ETag'])
+        self.assertIn('SUMMARY:Renamed', body)
+
+    def test_category_feed(self):
+        url = reverse('category_feed', args=[self.music.pk])
+        response, body = self.get_ics(url)
+        self.assertIn('X-WR-CALNAME:Music', body)
+        self.assertIn(f'UID:event-{self.concert.pk}@testserver', body)
+        self.assertNotIn('Long gone', body)
+        self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 304)
+        self.music.name = 'Live music'
+        self.music.save()
+        self.assertIn('X-WR-CALNAME:Live music', self.get_ics(url, if_none_match=response['ETag'])[1])
+        self.assertEqual(self.client.get(reverse('category_feed', args=[999])).status_code, 404)
+
+    def test_long_lines_are_folded(self):
+        folded = _fold('DESCRIPTION:' + 'é' * 100)
+        lines = folded.split('\r\n ')
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        self.assertEqual(''.join(lines), 'DESCRIPTION:' + 'é' * 100 + '\r\n')
+
+    def test_my_events_links_the_feed(self):
+        self.client.force_login(self.participant)
+        response = self.client.get(reverse('my_events'))
+        self.assertContains(response, reverse('rsvp_feed', args=[feed_token(self.participant)]))
+
+
+class RecurrenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = make_user('organizer', 'Organizer')
+        cls.participant = make_user('participant')
+        cls.music = Category.objects.create(name='Music')
+        cls.today = timezone.localdate()
+        # every day for ten days from yesterday, at noon
+        cls.series = EventSeries.objects.create(
+            name='Daily jam', description='...', starts_on=cls.today - timedelta(days=1), time=time(12, 0),
+            location='Dhaka', category=cls.music, organizer=cls.organizer, rule='FREQ=DAILY;COUNT=10',
+        )
+        for days in (0, 3, 20):
+            make_event(cls.organizer, name=f'Gig {days}', date=cls.today + timedelta(days=days), category=cls.music)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rules(self):
+        monday = date(2026, 10, 5)
+        weekly = parse_rule('FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;COUNT=5')
+        self.assertEqual(list(weekly.dates(monday)), [
+            date(2026, 10, 5), date(2026, 10, 8), date(2026, 10, 19), date(2026, 10, 22), date(2026, 11, 2),
+        ])
+        monthly = parse_rule('FREQ=MONTHLY;UNTIL=20270601')
+        self.assertEqual(
+            list(monthly.dates(date(2027, 1, 31))),
+            [date(2027, 1, 31), date(2027, 3, 31), date(2027, 5, 31)],
+        )
+        self.assertEqual(monthly.last_date(date(2027, 1, 31)), date(2027, 6, 1))
+        # open-ended rules jump to the window, the result is the same as walking there
+        endless = parse_rule('FREQ=WEEKLY;BYDAY=TU,SA')
+        start, end = date(2040, 3, 1), date(2040, 4, 1)
+        walked = [d for d in endless.dates(monday, end=end) if d >= start]
+        self.assertEqual(list(endless.dates(monday, start, end)), walked)
+        self.assertEqual(len(walked), 9)
+        for bad in ('FREQ=YEARLY', 'FREQ=DAILY;COUNT=0', 'FREQ=MONTHLY;BYDAY=MO', 'FREQ=DAILY;COUNT=2;UNTIL=20270101', 'X'):
+            with self.assertRaises(ValueError, msg=bad):
+                parse_rule(bad)
+
+    def test_event_list_merges_occurrences_in_order(self):
+        self.client.force_login(self.participant)
+        seen, after = [], None
+        with mock.patch.object(EventListView, 'paginate_by', 3):
+            while True:
+                response = self.client.get(reverse('event_list'), {'after': after} if after else {})
+                seen += [(e.date, e.name) for e in response.context['events']]
+                page = response.context['page_obj']
+                if not page.has_next():
+                    break
+                after = page.next_cursor
+        dates = [day for day, _ in seen]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(sum(name == 'Daily jam' for _, name in seen), 10)
+        self.assertEqual(len(seen), 13)
+
+    @override_settings(RECURRENCE_HORIZON_DAYS=30)
+    def test_event_list_pages_keep_their_size(self):
+        EventSeries.objects.create(
+            name='Open mic', description='...', starts_on=self.today, time=time(19, 0),
+            location='Dhaka', category=self.music, organizer=self.organizer, rule='FREQ=DAILY',
+        )
+        url = reverse('event_list')
+        self.assertEqual(len(self.client.get(url).context['events']), EventListView.paginate_by)
+
+        pages, after = [], None
+        with mock.patch.object(EventListView, 'paginate_by', 5):
+            while True:
+                page = self.client.get(url, {'after': after} if after else {}).context['page_obj']
+                pages.append([(e.date, e.name) for e in page])
+                if not page.has_next():
+                    break
+                after = page.next_cursor
+            # 10 'Daily jam', 3 gigs and 31 'Open mic' up to the horizon
+            self.assertEqual([len(p) for p in pages], [5] * 8 + [4])
+            # and back from the last page through the prev cursors
+            back, before = [pages[-1]], page.prev_cursor
+            while before:
+                page = self.client.get(url, {'before': before}).context['page_obj']
+                back.append([(e.date, e.name) for e in page])
+                before = page.prev_cursor
+        self.assertEqual(back[::-1], pages)
+
+    def test_occurrence_rsvp_stores_it(self):
+        day = self.today + timedelta(days=2)
+        url = reverse('occurrence_detail', args=[self.series.pk, day.isoformat()])
+        self.assertContains(self.client.get(url), 'Daily jam')
+        self.assertEqual(self.client.get(reverse('occurrence_detail', args=[self.series.pk, '2001-01-01'])).status_code, 404)
+
+        self.client.force_login(self.participant)
+        response = self.client.post(reverse('occurrence_rsvp', args=[self.series.pk, day.isoformat()]))
+        event = Event.objects.get(series=self.series, occurrence_date=day)
+        self.assertRedirects(response, reverse('event_detail', args=[event.pk]))
+        self.assertEqual(event.rsvps.get().user, self.participant)
+        self.assertRedirects(self.client.get(url), reverse('event_detail', args=[event.pk]))
+
+        # the stored row takes the virtual occurrence's place in the list
+        events = self.client.get(reverse('event_list')).context['events']
+        on_day = [e for e in events if e.date == day]
+        self.assertEqual([(e.pk, e.participant_count) for e in on_day], [(event.pk, 1)])
+
+    def test_dashboard_and_feed(self):
+        self.client.force_login(make_user('admin', 'Admin'))
+        todays = self.client.get(reverse('admin_dashboard')).context['todays_events']
+        self.assertEqual([(e.name, e.pk is None) for e in todays], [('Daily jam', True), ('Gig 0', False)])
+
+        url = reverse('category_feed', args=[self.music.pk])
+        response = self.client.get(url)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 13)
+        self.assertIn(f'UID:event-s{self.series.pk}-{self.today:%Y%m%d}@testserver', body)
+        # editing the series moves the category's ETag
+        self.series.skipped_dates = [self.today.isoformat()]
+        self.series.save()
+        response = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content).decode().count('BEGIN:VEVENT'), 12)
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_superuser=True, is_staff=True)
+        organizer = make_user('organizer', 'Organizer')
+        cls.music = Category.objects.create(name='Music')
+        cls.art = Category.objects.create(name='Art')
+        cls.events = [
+            make_event(organizer, name=f'Concert {i}', time=time(18, 0), category=cls.music, capacity=2)
+            for i in range(3)
+        ]
+        cls.fans = [make_user(f'fan{i}') for i in range(3)]
+        for event in cls.events:
+            for fan in cls.fans:
+                book_seat(event, fan)  # the third fan is waitlisted
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        return self.client.get(reverse(f'admin:events_{model}_changelist'), params)
+
+    def test_rsvp_changelist_queries_dont_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as few:
+            self.changelist('rsvp')
+        for i in range(3, 13):
+            book_seat(self.events[0], make_user(f'fan{i}'))
+        with CaptureQueriesContext(connection) as many:
+            response = self.changelist('rsvp')
+        self.assertContains(response, 'fan12')
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
+        # no sidebar entry per event, a search box instead
+        self.assertNotContains(response, f'event__id__exact={self.events[1].pk}')
+        self.assertContains(response, 'data-model-name="rsvp" data-field-name="event"')
+        self.assertContains(response, 'admin/js/autocomplete.js')
+
+    def test_filter_and_search(self):
+        response = self.changelist('rsvp', event__id__exact=self.events[1].pk)
+        self.assertEqual({r.event_id for r in response.context['cl'].result_list}, {self.events[1].pk})
+        self.assertContains(response, f'<option value="{self.events[1].pk}" selected>Concert 1</option>', html=True)
+
+        response = self.changelist('rsvp', q='fan1')
+        self.assertEqual({r.user.username for r in response.context['cl'].result_list}, {'fan1'})
+        self.assertEqual(len(self.changelist('rsvp', q='concert').context['cl'].result_list), 9)
+        self.assertEqual(len(self.changelist('event', q='concert').context['cl'].result_list), 3)
+
+    def test_move_events_to_category(self):
+        url = reverse('admin:events_event_changelist')
+        selection = {'action': 'move_to_category', '_selected_action': [e.pk for e in self.events[:2]]}
+        response = self.client.post(url, selection)
+        self.assertContains(response, 'Move 2 events to')
+        response = self.client.post(url, {**selection, 'apply': 'Move', 'category': self.art.pk})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(Event.objects.filter(category=self.art).count(), 2)
+        self.assertGreater(Event.objects.get(pk=self.events[0].pk).version, self.events[0].version)
+
+    @mock.patch('events.admin.ACTION_CHUNK_SIZE', 2)
+    def test_cancel_rsvps_in_chunks_frees_seats(self):
+        event = self.events[0]
+        confirmed = RSVP.objects.filter(event=event, status=RSVP.CONFIRMED)
+        response = self.client.post(reverse('admin:events_rsvp_changelist'), {
+            'action': 'cancel_rsvps', '_selected_action': list(confirmed.values_list('pk', flat=True)),
+        })
+        self.assertEqual(response.status_code, 302)
+        # the waitlisted fan got one of the seats
+        self.assertEqual(list(RSVP.objects.filter(event=event).values_list('user__username', 'status')),
+                         [('fan2', RSVP.CONFIRMED)])
+        event.refresh_from_db()
+        self.assertEqual(event.participant_count, 1)
+
+    def test_estimated_count_paginator(self):
+        queryset = RSVP.objects.order_by('pk')
+        self.assertEqual(EstimatedCountPaginator(queryset, 5).count, 9)  # SQLite: exact
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch('events.pagination.planner_row_estimate', return_value=250000):
+            paginator = EstimatedCountPaginator(queryset, 100)
+            self.assertEqual(paginator.num_pages, 2500)
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch('events.pagination.planner_row_estimate', return_value=12):
+            self.assertEqual(EstimatedCountPaginator(queryset, 5).count, 9)
+
+
+class FileServingTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.static_root)
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        with open(os.path.join(cls.media_root, 'clip.bin'), 'wb') as f:
+            f.write(bytes(range(256)) * 4)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root, MEDIA_ROOT=cls.media_root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def css_url(self):
+        from django.templatetags.static import static
+        return static('css/output.css')
+
+    def test_collectstatic_writes_hashed_names_and_gzip(self):
+        url = self.css_url()
+        self.assertRegex(url, r'^/static/css/output\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, url[len('/static/'):] + '.gz')))
+
+    def test_negotiates_precompressed_variant(self):
+        url = self.css_url()
+        plain = self.client.get(url)
+        self.assertEqual(plain['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertNotIn('Content-Encoding', plain)
+        original = b''.join(plain.streaming_content)
+
+        response = self.client.get(url, headers={'accept-encoding': 'br;q=0, gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original)
+        self.assertNotEqual(response['ETag'], plain['ETag'])
+
+        self.assertEqual(self.client.get(url, headers={'if-none-match': plain['ETag']}).status_code, 304)
+        # the unhashed name changes in place, so it must be revalidated
+        self.assertEqual(self.client.get('/static/css/output.css')['Cache-Control'], 'no-cache')
+        self.assertEqual(self.client.get('/static/../settings.py').status_code, 404)
+
+    def test_range_requests(self):
+        response = self.client.get('/media/clip.bin', headers={'range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+        response = self.client.get('/media/clip.bin', headers={'range': 'bytes=-4'})
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(252, 256)))
+        self.assertEqual(self.client.get('/media/clip.bin', headers={'range': 'bytes=2000-'}).status_code, 416)
+        # a stale If-Range gets the whole (changed) file
+        response = self.client.get('/media/clip.bin', headers={'range': 'bytes=0-1', 'if-range': '"old"'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SENDFILE_BACKEND='nginx')
+    def test_hands_off_to_the_proxy(self):
+        response = self.client.get(self.css_url(), headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response['X-Accel-Redirect'], f"/internal{self.css_url()}.gz")
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get('/media/clip.bin')['X-Accel-Redirect'], '/internal/media/clip.bin')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        organizer = make_user('organizer', 'Organizer')
+
+        def event(name, location, description):
+            return make_event(organizer, name=name, location=location, description=description)
+        cls.jazz = event('Jazz night', 'Dhaka', 'Live music')
+        cls.rock = event('Rock concert', 'Chittagong', 'Guitars and jazz influences')
+        cls.talk = event('Python meetup', 'Dhaka', 'Talks')
+
+    def test_ranked_search(self):
+        results = list(Event.objects.search('jazz'))
+        self.assertEqual(results, [self.jazz, self.rock])  # name beats description
+        self.assertEqual(list(Event.objects.search('dhak')), [self.talk, self.jazz])  # prefix match
+
+    def test_index_follows_updates_and_deletes(self):
+        Event.objects.filter(pk=self.talk.pk).update(name='Django meetup')
+        self.assertEqual(list(Event.objects.search('django')), [self.talk])
+        self.assertEqual(list(Event.objects.search('python')), [])
+        self.jazz.delete()
+        self.assertEqual(list(Event.objects.search('jazz')), [self.rock])
+
+    def test_operators_in_user_input_are_ignored(self):
+        self.assertEqual(list(Event.objects.search('jazz" -(*')), [self.jazz, self.rock])
+
+    def test_event_list_search_box(self):
+        response = self.client.get(reverse('event_list'), {'q': 'dhaka'})
+        self.assertEqual({e.pk for e in response.context['events']}, {self.jazz.pk, self.talk.pk})
+
+
+class StartsAtTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', 'Admin')
+        cls.category = Category.objects.create(name='Music')
+        # today in Dhaka (UTC+6) runs from 18:00 UTC yesterday to 18:00 UTC today
+        cls.today = timezone.localdate(timezone=zoneinfo.ZoneInfo('Asia/Dhaka'))
+        cls.early = cls.event('Early', cls.today - timedelta(days=1), time(19, 0))  # 01:00 in Dhaka
+        cls.late = cls.event('Late', cls.today, time(19, 0))  # 01:00 tomorrow in Dhaka
+
+    @classmethod
+    def event(cls, name, day, at):
+        return make_event(cls.admin, name=name, date=day, time=at, category=cls.category)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.client.cookies['tz'] = 'Asia/Dhaka'
+
+    def test_starts_at_follows_date_and_time(self):
+        utc = timezone.get_fixed_timezone(0)
+        self.assertEqual(self.early.starts_at, datetime.combine(self.today - timedelta(days=1), time(19, 0), utc))
+        self.early.time = time(8, 0)
+        self.early.save(update_fields=['time'])
+        self.early.refresh_from_db()
+        self.assertEqual(self.early.starts_at.hour, 8)
+        [bulk] = Event.objects.bulk_create([Event(
+            name='Bulk', description='...', date=self.today, time=time(9, 30), location='Dhaka',
+            category=self.category, organizer=self.admin,
+        )])
+        self.assertEqual(Event.objects.get(pk=bulk.pk).starts_at, datetime.combine(self.today, time(9, 30), utc))
+
+    def test_form_checks_ends_at(self):
+        data = {
+            'name': 'Gig', 'description': '...', 'date': self.today, 'time': '19:00', 'location': 'Dhaka',
+            'category': self.category.pk, 'ends_at': f'{self.today}T18:00',
+        }
+        self.assertIn('ends_at', EventForm(data).errors)
+        data['ends_at'] = f'{self.today}T21:00'
+        self.assertTrue(EventForm(data).is_valid())
+
+    def test_form_uses_the_organizers_clock(self):
+        data = {
+            'name': 'Gig', 'description': '...', 'date': self.today, 'time': '19:00', 'location': 'Dhaka',
+            'category': self.category.pk, 'ends_at': f'{self.today}T21:00',
+        }
+        with timezone.override(zoneinfo.ZoneInfo('Asia/Dhaka')):
+            form = EventForm(data)
+            self.assertTrue(form.is_valid(), form.errors)
+            form.instance.organizer = self.admin
+            event = form.save()
+            self.assertEqual(EventForm(instance=event)['time'].value(), time(19, 0))
+        self.assertEqual(event.starts_at, datetime.combine(self.today, time(13, 0), timezone.get_fixed_timezone(0)))
+        # someone editing it in UTC sees, and keeps, the same moment
+        self.assertEqual(EventForm(instance=event)['time'].value(), time(13, 0))
+        self.assertContains(self.client.get(reverse('event_detail', args=[event.pk])), '7 p.m.')
+
+    def test_today_is_the_users_today(self):
+        todays = self.client.get(reverse('admin_dashboard')).context['todays_events']
+        self.assertEqual([e.name for e in todays], ['Early'])
+        response = self.client.get(reverse('event_list'), {'from': self.today, 'to': self.today})
+        self.assertEqual([e.name for e in response.context['events']], ['Early'])
+
+        # an unknown zone falls back to TIME_ZONE (UTC)
+        self.client.cookies['tz'] = '../etc/passwd'
+        response = self.client.get(reverse('event_list'), {'from': self.today, 'to': self.today})
+        self.assertEqual([e.name for e in response.context['events']], ['Late'])
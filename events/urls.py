@@ -1,8 +1,10 @@
 from django.urls import path
+from . import api, attendees, feeds
 from django.contrib.auth.views import LoginView, LogoutView
 from .views import (
     EventListView, EventDetailView, EventCreateView, EventUpdateView, EventDeleteView,
-    RSVPCreateView, MyEventsView,
+    EventSeriesCreateView, occurrence_detail, occurrence_rsvp,
+    RSVPCreateView, RSVPCancelView, MyEventsView,
     UserProfileView, UserProfileUpdateView,
     CustomPasswordChangeView, CustomPasswordChangeDoneView,
     CustomPasswordResetView, CustomPasswordResetDoneView,
@@ -23,6 +25,11 @@ urlpatterns = [
     path('event/<int:pk>/update/', EventUpdateView.as_view(), name='event_update'),
     path('event/<int:pk>/delete/', EventDeleteView.as_view(), name='event_delete'),
 
+    # Recurring events
+    path('series/create/', EventSeriesCreateView.as_view(), name='series_create'),
+    path('series/<int:pk>/<str:day>/', occurrence_detail, name='occurrence_detail'),
+    path('series/<int:pk>/<str:day>/rsvp/', occurrence_rsvp, name='occurrence_rsvp'),
+
     # Categories CRUD (FBV)
     path('categories/', category_list, name='category_list'),
     path('categories/add/', category_create, name='category_add'),
@@ -31,8 +38,13 @@ urlpatterns = [
 
     # RSVP
     path('event/<int:pk>/rsvp/', RSVPCreateView.as_view(), name='event_rsvp'),
+    path('event/<int:pk>/rsvp/cancel/', RSVPCancelView.as_view(), name='event_rsvp_cancel'),
     path('my-events/', MyEventsView.as_view(), name='my_events'),
 
+    # Attendees (event organizer)
+    path('event/<int:pk>/attendees/', attendees.export_attendees, name='event_attendees_export'),
+    path('event/<int:pk>/check-in/', attendees.check_in, name='event_check_in'),
+
     # User Auth
     path('signup/', signup_view, name='signup'),
     path('activate/<uidb64>/<token>/', activate_account, name='activate'),
@@ -52,6 +64,16 @@ urlpatterns = [
     path('reset/<uidb64>/<token>/', CustomPasswordResetConfirmView.as_view(template_name ="registration/password_reset_confirm.html"), name='password_reset_confirm'),
     path('reset/done/', CustomPasswordResetCompleteView.as_view(template_name ="registration/password_reset_complete.html"), name='password_reset_complete'),
 
+    # JSON API
+    path('api/v1/events/', api.event_list, name='api_event_list'),
+    path('api/v1/events/<int:pk>/', api.event_detail, name='api_event_detail'),
+    path('api/v1/categories/', api.category_list, name='api_category_list'),
+    path('api/v1/me/rsvps/', api.my_rsvps, name='api_my_rsvps'),
+
+    # Calendar feeds
+    path('feeds/rsvps/<str:token>.ics', feeds.rsvp_feed, name='rsvp_feed'),
+    path('feeds/categories/<int:pk>.ics', feeds.category_feed, name='category_feed'),
+
     # Dashboards
     path('dashboard/admin/', admin_dashboard, name='admin_dashboard'),
     path('dashboard/organizer/', organizer_dashboard, name='organizer_dashboard'),
@@ -1,4 +1,7 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.urls import reverse_lazy, reverse
 from django.contrib.auth import authenticate, login, get_user_model
 from django.contrib.auth.decorators import login_required
@@ -10,14 +13,30 @@ from django.contrib.auth.views import (
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Count
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView, View
+from django.http import Http404
+from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 
-from .models import Event, RSVP, CustomUser, Category
-from .forms import EventForm, RSVPForm, CustomUserChangeForm, CustomUserCreationForm, CategoryForm
+from .models import Event, EventSeries, RSVP, CustomUser, Category, day_bounds
+from .forms import (
+    EventForm, EventSeriesForm, RSVPForm, CustomUserChangeForm, CustomUserCreationForm, CategoryForm, EventFilterForm,
+)
+from .booking import book_seat
+from .stats import dashboard_stats
+from .caching import (
+    acondition, aevent_list_last_modified, aevent_list_tag, aviewer_tag, cached_render, fragment_key,
+)
+from .occurrences import merge, paginate_event_list, virtual_starting_between
+from .feeds import rsvp_feed_url
+from .attendees import can_manage_attendees
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
-from .helpers import in_groups_required
+from .helpers import in_groups_required, has_role, aget_user, aget_user_roles, ahas_role
 from django.contrib.auth.tokens import default_token_generator
 
 User = get_user_model()
@@ -56,42 +75,49 @@ def post_login_redirect(request):
     user = request.user
     if user.is_superuser:
         return redirect('admin_dashboard')
-    if user.groups.filter(name='Organizer').exists():
+    if has_role(user, 'Organizer'):
         return redirect('organizer_dashboard')
     return redirect('participant_dashboard')
 
 def home_redirect(request):
     return redirect('event_list')
 
+async def _dashboard(request, template_name):
+    # today in the user's time zone (TimezoneMiddleware)
+    today = timezone.localdate()
+    await aget_user(request)
+    todays_events = [
+        event async for event in Event.objects.starting_on(today).with_cards().order_by('starts_at', 'id')
+    ]
+    todays_events = merge(
+        todays_events, await sync_to_async(virtual_starting_between)(*day_bounds(today)), key=lambda e: e.starts_at,
+    )
+    # cached snapshot or one aggregate pass, plain sync code so it runs in a worker thread
+    stats = await sync_to_async(dashboard_stats)(today)
+    return TemplateResponse(request, template_name, {
+        'stats': stats,
+        'todays_events': todays_events,
+        'categories': stats['categories'],
+        'rsvps_per_day': stats['rsvps_per_day'],
+    })
+
 @login_required
 @in_groups_required('Admin')
-def admin_dashboard(request):
-    today = timezone.localdate()
-    stats = {
-        'total_events': Event.objects.count(),
-        'total_users': User.objects.count(),
-        'upcoming_events': Event.objects.filter(date__gte=today).count(),
-        'past_events': Event.objects.filter(date__lt=today).count(),
-    }
-    todays_events = Event.objects.filter(date=today).select_related('category').annotate(participant_count=Count('rsvps'))
-    return render(request, 'dashboards/admin_dashboard.html', {'stats': stats, 'todays_events': todays_events})
+async def admin_dashboard(request):
+    return await _dashboard(request, 'dashboards/admin_dashboard.html')
 
 @login_required
 @in_groups_required('Organizer','Admin')
-def organizer_dashboard(request):
-    today = timezone.localdate()
-    stats = {
-        'total_events': Event.objects.count(),
-        'upcoming_events': Event.objects.filter(date__gte=today).count(),
-        'past_events': Event.objects.filter(date__lt=today).count(),
-    }
-    todays_events = Event.objects.filter(date=today).select_related('category').annotate(participant_count=Count('rsvps'))
-    return render(request, 'dashboards/organizer_dashboard.html', {'stats': stats, 'todays_events': todays_events})
+async def organizer_dashboard(request):
+    return await _dashboard(request, 'dashboards/organizer_dashboard.html')
 
 @login_required
-def participant_dashboard(request):
-    my_events = Event.objects.filter(rsvps__user=request.user).select_related('category').annotate(participant_count=Count('rsvps'))
-    return render(request, 'dashboards/participant_dashboard.html', {'my_events': my_events})
+async def participant_dashboard(request):
+    user = await aget_user(request)
+    my_events = [
+        event async for event in Event.objects.rsvped_by(user).with_cards().order_by('starts_at')
+    ]
+    return TemplateResponse(request, 'dashboards/participant_dashboard.html', {'events': my_events})
 
 # ------------------------ PROFILE ------------------------
 
@@ -137,37 +163,95 @@ class CustomPasswordResetCompleteView(PasswordResetCompleteView):
 
 # ------------------------ EVENT (CBV) ------------------------
 
-class EventListView(ListView):
-    model = Event
-    template_name = "events/event_list.html"
-    context_object_name = "events"
-    ordering = ['-date']
+# The read-heavy views below are async: under ASGI they don't hold a worker
+# thread while waiting for the database. Templates are rendered by the handler
+# in a worker thread (TemplateResponse), so everything they show is loaded here.
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        user = self.request.user
-        # Add category list for filter
-        context['categories'] = Category.objects.all()
-        # Role-based add button visibility
-        context['can_add_event'] = user.is_authenticated and (user.is_superuser or user.groups.filter(name='Organizer').exists())
-        return context
+async def _event_list_etag(request, *args, **kwargs):
+    return f"events-{await aevent_list_tag(request)}-{await aviewer_tag(request)}"
 
+@method_decorator(acondition(etag_func=_event_list_etag, last_modified_func=aevent_list_last_modified), name='get')
+class EventListView(View):
+    template_name = "events/event_list.html"
+    paginate_by = 24
 
-class EventDetailView(DetailView):
-    model = Event
+    def get_queryset(self):
+        self.filter_form = EventFilterForm(self.request.GET)
+        return self.filter_form.filter(Event.objects.with_cards())
+
+    async def get(self, request, *args, **kwargs):
+        user = await aget_user(request)
+        # Keyset pagination on (date, id) instead of OFFSET, over the stored events
+        # and the recurring events' occurrences that aren't stored, see occurrences.py
+        queryset = self.get_queryset()
+        page = await sync_to_async(paginate_event_list)(
+            queryset, self.filter_form.cleaned_data, self.paginate_by,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        return TemplateResponse(request, self.template_name, {
+            'events': page.object_list,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            # Add category list for filter
+            'categories': [category async for category in Category.objects.all()],
+            # Role-based add button visibility
+            'can_add_event': user.is_authenticated and (user.is_superuser or await ahas_role(user, 'Organizer')),
+        })
+
+
+async def _get_event(request, pk):
+    # loaded once for the ETag, Last-Modified and the page itself
+    if not hasattr(request, '_event'):
+        request._event = await Event.objects.with_cards().filter(pk=pk).afirst()
+    return request._event
+
+async def _event_etag(request, pk):
+    event = await _get_event(request, pk)
+    return event and f"event-{pk}-v{event.version}-{await aviewer_tag(request)}"
+
+async def _event_last_modified(request, pk):
+    event = await _get_event(request, pk)
+    return event and event.updated_at
+
+def _render_event_fragments(event):
+    # The parts of the detail page that are the same for everyone
+    rsvps = list(event.rsvps.select_related('user').order_by('created_at', 'id'))
+    confirmed = [r for r in rsvps if r.status == RSVP.CONFIRMED]
+    context = {'event': event, 'rsvps': confirmed, 'waitlist_count': len(rsvps) - len(confirmed)}
+    return {
+        'info': render_to_string('events/_event_info.html', context),
+        'participants': render_to_string('events/_event_participants.html', context),
+    }
+
+@method_decorator(acondition(etag_func=_event_etag, last_modified_func=_event_last_modified), name='get')
+class EventDetailView(View):
     template_name = "events/event_detail.html"
-    context_object_name = "event"
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        user = self.request.user
+    async def get(self, request, pk):
+        event = await _get_event(request, pk)
+        if event is None:
+            raise Http404("No event found matching the query")
+        user = await aget_user(request)
+        # shared fragments are cached per event version, the RSVP state below is per user
+        fragments = await sync_to_async(cached_render)(
+            fragment_key('event-page', event), lambda: _render_event_fragments(event)
+        )
+        context = {
+            'event': event,
+            'event_info': mark_safe(fragments['info']),
+            'participants': mark_safe(fragments['participants']),
+        }
+        status = None
         if user.is_authenticated:
             context['rsvp_form'] = RSVPForm()
-            context['user_has_rsvped'] = RSVP.objects.filter(user=user, event=self.object).exists()
-        else:
-            context['user_has_rsvped'] = False
-        context['rsvps'] = self.object.rsvps.all()
-        return context
+            status = await RSVP.objects.filter(event=event, user=user).values_list('status', flat=True).afirst()
+            await aget_user_roles(user)  # for the has_group filter in the template
+            # the roles are loaded now, so this doesn't query
+            context['can_export_attendees'] = can_manage_attendees(user, event)
+        context['user_has_rsvped'] = status == RSVP.CONFIRMED
+        context['user_is_waitlisted'] = status == RSVP.WAITLISTED
+        return TemplateResponse(request, self.template_name, context)
 
 class EventCreateView(LoginRequiredMixin, CreateView):
     model = Event
@@ -180,6 +264,18 @@ class EventCreateView(LoginRequiredMixin, CreateView):
         messages.success(self.request, "Event created successfully!")
         return super().form_valid(form)
 
+class EventSeriesCreateView(LoginRequiredMixin, CreateView):
+    model = EventSeries
+    form_class = EventSeriesForm
+    template_name = "events/event_form.html"
+    success_url = reverse_lazy("event_list")
+    extra_context = {'title': 'Add Recurring Event'}
+
+    def form_valid(self, form):
+        form.instance.organizer = self.request.user
+        messages.success(self.request, "Recurring event created successfully!")
+        return super().form_valid(form)
+
 class EventUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     model = Event
     form_class = EventForm
@@ -203,6 +299,36 @@ class EventDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         event = self.get_object()
         return self.request.user == event.organizer or self.request.user.is_superuser
 
+# ------------------------ RECURRING EVENTS (Function-based) ------------------------
+
+def _get_occurrence(pk, day):
+    series = get_object_or_404(EventSeries.objects.select_related('category'), pk=pk)
+    try:
+        day = datetime.date.fromisoformat(day)
+    except ValueError:
+        raise Http404("Not a date")
+    if not series.has_date(day):
+        raise Http404("The series has no occurrence on that day")
+    return series, day
+
+def occurrence_detail(request, pk, day):
+    """An occurrence of a recurring event; the stored Event's page once it has one."""
+    series, day = _get_occurrence(pk, day)
+    stored = Event.objects.filter(series=series, occurrence_date=day).values_list('pk', flat=True).first()
+    if stored:
+        return redirect('event_detail', pk=stored)
+    return render(request, 'events/occurrence_detail.html', {'event': series.occurrence(day)})
+
+@require_POST
+@login_required
+def occurrence_rsvp(request, pk, day):
+    # the first RSVP stores the occurrence, then it's booked like any event
+    series, day = _get_occurrence(pk, day)
+    event, _ = series.materialize(day)
+    rsvp, created = book_seat(event, request.user)
+    _rsvp_message(request, rsvp)
+    return redirect("event_detail", pk=event.pk)
+
 # ------------------------ CATEGORIES (Function-based) ------------------------
 
 @login_required
@@ -244,23 +370,49 @@ def category_delete(request, pk):
 
 # ------------------------ RSVP (CBV) ------------------------
 
-class RSVPCreateView(LoginRequiredMixin, View):
-    def post(self, request, pk):
-        event = get_object_or_404(Event, pk=pk)
-        RSVP.objects.get_or_create(user=request.user, event=event)
+def _rsvp_message(request, rsvp):
+    if rsvp.status == RSVP.CONFIRMED:
         messages.success(request, "You have successfully RSVP’d to this event.")
+    else:
+        messages.warning(request, "This event is full. You have been added to the waitlist.")
+
+@method_decorator(login_required, name='post')
+@method_decorator(login_required, name='get')
+class RSVPCreateView(View):
+    async def post(self, request, pk):
+        event = await aget_object_or_404(Event, pk=pk)
+        user = await aget_user(request)
+        # Row locks and the transaction need the sync ORM. The confirmation email is
+        # only an outbox row here, send_queued_emails delivers it later.
+        rsvp, created = await sync_to_async(book_seat)(event, user)
+        _rsvp_message(request, rsvp)
+        return redirect("event_detail", pk=pk)
+
+    async def get(self, request, pk):
+        return redirect("event_detail", pk=pk)
+
+class RSVPCancelView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        # post_delete frees the seat and promotes the waitlist
+        RSVP.objects.filter(user=request.user, event_id=pk).delete()
+        messages.success(request, "Your RSVP has been cancelled.")
         return redirect("event_detail", pk=pk)
 
     def get(self, request, pk):
         return redirect("event_detail", pk=pk)
 
 class MyEventsView(LoginRequiredMixin, ListView):
-    model = RSVP
+    model = Event
     template_name = "events/my_rsvps.html"
-    context_object_name = "rsvps"
+    context_object_name = "events"
 
     def get_queryset(self):
-        return RSVP.objects.filter(user=self.request.user)
+        return Event.objects.rsvped_by(self.request.user).with_cards().order_by('starts_at')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['feed_url'] = rsvp_feed_url(self.request, self.request.user)
+        return context
 
 # ------------------------ USER (CBV) ------------------------
 